@@ -0,0 +1,332 @@
+import math
+
+import numpy as np
+import pygame
+
+from collision import sweep_walls, sweep_rect
+from components import EMPTY, EXPLOSIVE, UNBREAKABLE, FIRE_NEIGHBORHOOD, BROKEN, EXPLODED, BURNED
+
+MAX_CONTACTS = 8  # Contacts resolved per fast ball and tick before the rest of its move is dropped
+
+class BallSystem:
+    """All balls of a game as contiguous arrays, advanced and collided in one batched pass per tick.
+
+    Positions are the top-left corner of each ball's square, velocities are in pixels per tick. The masks
+    and corner lookups of a tick are computed into scratch arrays sized with the ball arrays, so a steady
+    tick allocates next to nothing.
+    """
+    def __init__(self, size=10, speed=5, color=(255, 255, 255), capacity=16):
+        self.size = size
+        self.speed = speed
+        self.speed_scale = 1.0  # Combined slow_ball/fast_ball multiplier, applied to new balls too
+        self.color = color
+        self.count = 0
+        self.profiler = None  # Optional profiler.PhaseProfiler
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.prev_x = np.zeros(capacity)  # Positions before the last step, for render interpolation
+        self.prev_y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.sharp = np.zeros(capacity, dtype=bool)
+        self.fire = np.zeros(capacity, dtype=bool)
+        self.attached = np.zeros(capacity, dtype=bool)
+        # Offsets of the top-left, top-right, bottom-left and bottom-right corner from a ball's position
+        self._corner_dx = (0.0, size - 1.0, 0.0, size - 1.0)
+        self._corner_dy = (0.0, 0.0, size - 1.0, size - 1.0)
+        self._allocate_scratch(capacity)
+
+    _fields = ("x", "y", "prev_x", "prev_y", "vx", "vy", "sharp", "fire", "attached")
+
+    def _reserve(self, count):
+        capacity = len(self.x)
+        if count <= capacity:
+            return
+        while capacity < count:
+            capacity *= 2
+        for name in self._fields:
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+        self._allocate_scratch(capacity)
+
+    def _allocate_scratch(self, capacity):
+        """Work arrays of step(), one entry per ball slot (four per slot, one per corner, for the tile lookups)."""
+        self._scratch = {name: np.zeros(capacity, dtype=dtype) for name, dtype in
+                         (("work", float), ("free", bool), ("fast", bool), ("slow", bool), ("mask", bool), ("test", bool))}
+        self._scratch.update((name, np.zeros(4 * capacity, dtype=dtype)) for name, dtype in
+                             (("corner_x", float), ("corner_y", float), ("corner_rows", np.intp), ("corner_cols", np.intp),
+                              ("corner_index", np.intp), ("corner_types", np.int8), ("corner_mask", bool), ("corner_test", bool)))
+        self._views = {}
+        self._views_count = -1
+
+    def _views_of(self, n):
+        """Views of the first n balls in the ball and scratch arrays, rebuilt only when the ball count changes.
+
+        Corner arrays are viewed as contiguous (4, n) blocks, ufuncs on strided views need buffers.
+        """
+        if self._views_count != n:
+            self._views = {name: array[:4 * n].reshape(4, n) if name.startswith("corner_") else array[:n]
+                           for name, array in self._scratch.items()}
+            self._views.update((name, getattr(self, name)[:n]) for name in self._fields)
+            for name in ("corner_x", "corner_y", "corner_mask"):
+                self._views[name + "_rows"] = tuple(self._views[name])
+            self._views_count = n
+        return self._views
+
+    def add(self, x, y, vx, vy, sharp=False, fire=False, attached=False):
+        self._reserve(self.count + 1)
+        i = self.count
+        self.x[i], self.y[i], self.vx[i], self.vy[i] = x, y, vx, vy
+        self.prev_x[i], self.prev_y[i] = x, y
+        self.sharp[i], self.fire[i], self.attached[i] = sharp, fire, attached
+        self.count += 1
+        return i
+
+    def reset(self, x, y):
+        """Drop every ball and put a single one at center (x, y), held by the paddle."""
+        self.count = 0
+        speed = self.speed * self.speed_scale
+        self.add(x - self.size / 2, y - self.size / 2, speed, -speed, attached=True)
+
+    def release(self):
+        self.attached[:self.count] = False
+
+    def any_attached(self):
+        return bool(self.attached[:self.count].any())
+
+    def multiply(self, copies=2, spread=math.radians(20)):
+        """Add copies of every ball, sharing its properties, with velocities fanned out by spread."""
+        n = self.count
+        self._reserve(n * (copies + 1))
+        for k in range(1, copies + 1):
+            angle = spread * ((k + 1) // 2) * (1 if k % 2 else -1)
+            cos, sin = math.cos(angle), math.sin(angle)
+            new = slice(n * k, n * (k + 1))
+            for name in ("x", "y", "prev_x", "prev_y", "sharp", "fire", "attached"):
+                getattr(self, name)[new] = getattr(self, name)[:n]
+            self.vx[new] = self.vx[:n] * cos - self.vy[:n] * sin
+            self.vy[new] = self.vx[:n] * sin + self.vy[:n] * cos
+        self.count = n * (copies + 1)
+
+    def set_property(self, name, value=True):
+        """Give every ball the "sharp" or "fire" property."""
+        getattr(self, name)[:self.count] = value
+
+    def scale_speed(self, factor):
+        self.vx[:self.count] *= factor
+        self.vy[:self.count] *= factor
+
+    def set_speed_scale(self, scale):
+        """Rescale every ball from the current to the given multiple of the base speed."""
+        if scale != self.speed_scale:
+            self.scale_speed(scale / self.speed_scale)
+            self.speed_scale = scale
+
+    def _corner_cells(self, tiles, views):
+        """(4, n) arrays of row, column and tile type under each corner of each ball, row-major corner order.
+
+        The arrays are scratch views and are overwritten by the next call.
+        """
+        x, y, xs, ys = views["x"], views["y"], views["corner_x"], views["corner_y"]
+        for i in range(4):  # Row by row, a broadcast add would need an iterator buffer
+            np.add(x, self._corner_dx[i], out=views["corner_x_rows"][i])
+            np.add(y, self._corner_dy[i], out=views["corner_y_rows"][i])
+        xs -= tiles.left
+        xs /= tiles.tile_width
+        ys -= tiles.top
+        ys /= tiles.tile_height
+        cols, rows = views["corner_cols"], views["corner_rows"]
+        cols[...] = np.floor(xs, out=xs)
+        rows[...] = np.floor(ys, out=ys)
+
+        inside, test = views["corner_mask"], views["corner_test"]
+        np.greater_equal(rows, 0, out=inside)
+        inside &= np.less(rows, tiles.rows, out=test)
+        inside &= np.greater_equal(cols, 0, out=test)
+        inside &= np.less(cols, tiles.columns, out=test)
+        # Corners off the board are looked up at a clipped index, then blanked
+        index, types = views["corner_index"], views["corner_types"]
+        np.multiply(rows, tiles.columns, out=index)
+        index += cols
+        np.take(tiles.types, index, out=types, mode="clip")
+        np.copyto(types, EMPTY, where=np.logical_not(inside, out=test))
+        return rows, cols, types
+
+    def step(self, screen_width, screen_height, margin, score_padding, paddle, tiles):
+        """Advance every ball by one tick. Returns (score earned, number of balls lost)."""
+        n = self.count
+        views = self._views_of(n)
+        x, y, vx, vy, attached = views["x"], views["y"], views["vx"], views["vy"], views["attached"]
+        views["prev_x"][...] = x
+        views["prev_y"][...] = y
+        size, work, mask, test = self.size, views["work"], views["mask"], views["test"]
+
+        # Balls held by the magnetic paddle follow it
+        if np.count_nonzero(attached):  # count_nonzero, unlike any(), needs no reduction buffer
+            x[attached] = paddle.rect.centerx - size / 2
+            y[attached] = paddle.rect.top - 1 - size
+        free = np.logical_not(attached, out=views["free"])
+
+        # Balls moving further than their own size per tick could skip past tiles or the paddle,
+        # they take the swept path one by one. Everything else is handled in the batched pass below.
+        fast = np.greater(np.abs(vx, out=work), size, out=views["fast"])
+        fast |= np.greater(np.abs(vy, out=work), size, out=test)
+        fast &= free
+        slow = np.logical_not(fast, out=views["slow"])
+        slow &= free
+        np.add(x, vx, out=x, where=slow)
+        np.add(y, vy, out=y, where=slow)
+
+        # Bounce on screen borders, always pointing away from the wall so balls can't get stuck in it
+        np.less_equal(x, margin, out=mask)
+        mask &= slow
+        np.abs(vx, out=vx, where=mask)
+        np.add(x, size, out=work)
+        np.greater_equal(work, screen_width - margin, out=mask)
+        mask &= slow
+        np.negative(np.abs(vx, out=vx, where=mask), out=vx, where=mask)
+        np.less_equal(y, score_padding + margin, out=mask)
+        mask &= slow
+        np.abs(vy, out=vy, where=mask)
+
+        # Paddle
+        p = paddle.rect
+        np.less(x, p.right, out=mask)
+        mask &= slow
+        mask &= np.greater(work, p.left, out=test)  # work still holds x + size
+        mask &= np.less(y, p.bottom, out=test)
+        np.add(y, size, out=work)
+        mask &= np.greater(work, p.top, out=test)
+        np.negative(np.abs(vy, out=vy, where=mask), out=vy, where=mask)
+
+        if self.profiler:
+            self.profiler.mark("tile_collision")
+        gained = self._collide_tiles(tiles, views, slow)
+        if np.count_nonzero(fast):
+            for i in np.nonzero(fast)[0]:
+                gained += self._sweep_ball(i, screen_width, margin, score_padding, paddle, tiles)
+
+        # Balls leaving through the bottom are removed
+        np.add(y, size, out=work)
+        lost = np.greater_equal(work, screen_height - margin, out=mask)
+        lost &= free
+        lost_count = int(np.count_nonzero(lost))
+        if lost_count:
+            keep = ~lost
+            for name in self._fields:
+                values = getattr(self, name)
+                values[:n - lost_count] = values[:n][keep]
+            self.count = n - lost_count
+        return gained, lost_count
+
+    def _collide_tiles(self, tiles, views, active):
+        rows, cols, types = self._corner_cells(tiles, views)
+        occupied = np.not_equal(types, EMPTY, out=views["corner_mask"])
+        for row in views["corner_mask_rows"]:
+            row &= active
+        if not np.count_nonzero(occupied):
+            return 0
+        hitting = occupied.any(axis=0)
+
+        # First occupied corner per ball, matching Ball.check_collision_with_tiles' row-major order
+        first = occupied.argmax(axis=0)
+        balls = np.nonzero(hitting)[0]
+        row, col, tile_type = rows[first[balls], balls], cols[first[balls], balls], types[first[balls], balls]
+        sharp, fire = self.sharp[balls], self.fire[balls]
+        plain = ~sharp & ~fire
+
+        shape = tiles.types.shape
+        cut = np.zeros(shape, dtype=bool)
+        cut[row[sharp], col[sharp]] = True  # Sharp balls cut through any tile
+        burning = np.zeros(shape, dtype=bool)
+        burning[row[fire], col[fire]] = True  # Fire balls burn the 8-neighborhood, unbreakable tiles included
+        explosive = np.zeros(shape, dtype=bool)
+        explosive_hits = tile_type == EXPLOSIVE  # Explosives go off under any ball, sharp ones just don't bounce
+        explosive[row[explosive_hits], col[explosive_hits]] = True
+        burned = burning | tiles.neighborhood_mask(burning, FIRE_NEIGHBORHOOD)
+        exploded = tiles.chain_reaction(explosive)
+
+        hit = np.zeros(shape, dtype=bool)
+        breakable_hits = plain & (tile_type != EXPLOSIVE) & (tile_type != UNBREAKABLE)
+        hit[row[breakable_hits], col[breakable_hits]] = True
+
+        # All masks are taken from the board before anything is removed. They are applied per cause for
+        # TileGrid.removed, a tile reached by several counts for the first.
+        gained = tiles.hit(hit & ~(burned | exploded | cut))
+        if np.count_nonzero(fire):
+            gained += tiles.destroy(burned, BURNED)
+        if np.count_nonzero(explosive_hits):
+            gained += tiles.destroy(exploded, EXPLODED)
+        if np.count_nonzero(sharp):
+            gained += tiles.destroy(cut, BROKEN)
+        reflect = balls[~sharp]  # Sharp balls penetrate tiles without changing direction
+        self.vy[reflect] = -self.vy[reflect]
+        return gained
+
+    def _sweep_ball(self, i, screen_width, margin, score_padding, paddle, tiles):
+        """Move ball i along its whole path for this tick, resolving contacts in time order."""
+        x, y, vx, vy = float(self.x[i]), float(self.y[i]), float(self.vx[i]), float(self.vy[i])
+        sharp, fire = bool(self.sharp[i]), bool(self.fire[i])
+        dx, dy = vx, vy
+        gained = 0
+        for _ in range(MAX_CONTACTS):
+            contact = sweep_walls(x, y, self.size, dx, dy, margin, score_padding + margin, screen_width - margin)
+            if dy > 0:
+                paddle_contact = sweep_rect(x, y, self.size, dx, dy, paddle.rect)
+                if paddle_contact is not None and (contact is None or paddle_contact[0] < contact[0]):
+                    contact = paddle_contact
+            cell = None
+            tile_contact = tiles.sweep(x, y, self.size, dx, dy)
+            if tile_contact is not None and (contact is None or tile_contact[0] < contact[0]):
+                t, cell, nx, ny = tile_contact
+                contact = (t, nx, ny)
+            if contact is None:
+                x, y = x + dx, y + dy
+                break
+
+            t, nx, ny = contact
+            x, y = x + dx * t, y + dy * t
+            dx, dy = dx * (1 - t), dy * (1 - t)
+            if cell is not None:
+                gained += self._hit_cell(tiles, cell, sharp, fire)
+                if sharp:
+                    continue  # Sharp balls penetrate tiles without changing direction
+            if nx:
+                vx, dx = -vx, -dx
+            if ny:
+                vy, dy = -vy, -dy
+        # prev_x/prev_y keep the start of the tick set by step(). Across a bounce the interpolated ball cuts
+        # the corner by at most one tick of movement, which is less visible than snapping fast balls.
+        self.x[i], self.y[i], self.vx[i], self.vy[i] = x, y, vx, vy
+        return gained
+
+    def _hit_cell(self, tiles, cell, sharp, fire):
+        """Apply a single ball's hit on a tile cell with the same rules as the batched pass."""
+        mask = tiles.cell_mask(cell)
+        tile_type = tiles.types[cell]
+        exploded = tiles.chain_reaction(mask) if tile_type == EXPLOSIVE else None  # Taken before anything burns
+        gained = 0
+        if fire:
+            gained += tiles.destroy(mask | tiles.neighborhood_mask(mask, FIRE_NEIGHBORHOOD), BURNED)
+        if exploded is not None:
+            gained += tiles.destroy(exploded, EXPLODED)
+        elif sharp:
+            gained += tiles.destroy(mask)
+        elif not fire:
+            gained += tiles.hit(mask)
+        return gained
+
+    def draw(self, surface, alpha=1.0, camera_y=0):
+        """Draw every ball alpha of the way from its previous to its current position, return the drawn rects.
+
+        camera_y is the world y at the top of surface.
+        """
+        n, size, color = self.count, self.size, self.color
+        if alpha < 1.0:
+            xs = self.prev_x[:n] + (self.x[:n] - self.prev_x[:n]) * alpha
+            ys = self.prev_y[:n] + (self.y[:n] - self.prev_y[:n]) * alpha
+        else:
+            xs, ys = self.x[:n], self.y[:n]
+        return [pygame.draw.ellipse(surface, color, (x, y - camera_y, size, size)) for x, y in zip(xs.tolist(), ys.tolist())]
@@ -0,0 +1,346 @@
+"""Benchmarks for the game's hot paths.
+
+    python bench.py                          # run everything and print timings
+    python bench.py --save baseline.json     # store results as a baseline
+    python bench.py --compare baseline.json  # report cases that got slower than the baseline
+    python bench.py -k collision             # only run cases whose name contains "collision"
+    python bench.py --allocs                 # check that a playing frame stays within its allocation budget
+
+Rendering cases use SDL's dummy video driver, so no display is needed.
+"""
+import argparse
+import atexit
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+import pygame
+
+from components import Ball, TileGrid, generate_tiles, tile_types, EMPTY, EXPLOSIVE
+
+BOARD_SIZES = [(5, 10), (50, 40), (200, 100)]
+DENSITIES = [0.25, 0.5, 0.9]
+FRAME_ALLOC_BUDGET = 2048  # Bytes a steady-state playing frame may have allocated at once, short-lived NumPy buffers
+FRAME_RETAIN_BUDGET = 16  # Bytes per frame that may stay allocated afterwards, averaged over the run
+
+cases = {}  # name -> function(number) returning seconds for number iterations, state set up untimed
+
+def case(name):
+    def register(function):
+        cases[name] = function
+        return function
+    return register
+
+def random_board(rows, columns, density, seed=0, explosive_share=0.1):
+    """Board filled to density: explosive_share explosive tiles, 10% unbreakable, 10% hard, the rest basic."""
+    rng = np.random.default_rng(seed)
+    types = rng.choice([0, 1, 2, 4], size=(rows, columns), p=[0.8 - explosive_share, explosive_share, 0.1, 0.1])
+    types[rng.random((rows, columns)) >= density] = EMPTY
+    tiles = TileGrid(rows, columns, 30, 30, 20, 60)
+    tiles.fill(types)
+    return tiles
+
+def ball_positions(tiles, count, seed=0):
+    rng = random.Random(seed)
+    right = tiles.left + tiles.columns * tiles.tile_width
+    bottom = tiles.top + tiles.rows * tiles.tile_height
+    return [(rng.randrange(tiles.left, right), rng.randrange(tiles.top, bottom)) for _ in range(count)]
+
+def _collision_case(rows, columns, density, chunk=1000):
+    def run(number):
+        tiles = random_board(rows, columns, density)
+        types = tiles.types.copy()
+        ball = Ball(0, 0)
+        positions = ball_positions(tiles, number)
+        elapsed = 0.0
+        for first in range(0, number, chunk):
+            tiles.fill(types)  # Put hit tiles back so the density holds for the whole run
+            start = time.perf_counter()
+            for position in positions[first:first + chunk]:
+                ball.rect.topleft = position
+                ball.check_collision_with_tiles(tiles, tile_types)
+            elapsed += time.perf_counter() - start
+        return elapsed
+    return run
+
+for _rows, _columns in BOARD_SIZES:
+    for _density in DENSITIES:
+        cases[f"collision/{_rows}x{_columns}/density={_density}"] = _collision_case(_rows, _columns, _density)
+
+def _generate_case(rows, columns):
+    def run(number):
+        start = time.perf_counter()
+        for _ in range(number):
+            generate_tiles(rows=rows, columns=columns)
+        return time.perf_counter() - start
+    return run
+
+for _rows, _columns in BOARD_SIZES:
+    cases[f"generate_tiles/{_rows}x{_columns}"] = _generate_case(_rows, _columns)
+
+def _explosion_case(rows, columns):
+    def run(number):
+        board = random_board(rows, columns, 0.9, explosive_share=0.5)
+        seeds = np.argwhere(board.types == EXPLOSIVE)
+        tiles = TileGrid(rows, columns, board.tile_width, board.tile_height, board.left, board.top)
+        elapsed = 0.0
+        for i in range(number):  # A whole chain reaction from one explosive, resolved and applied as one batch
+            tiles.fill(board.types)
+            start = time.perf_counter()
+            tiles.destroy(tiles.chain_reaction(tiles.cell_mask(tuple(seeds[i % len(seeds)]))))
+            elapsed += time.perf_counter() - start
+        return elapsed
+    return run
+
+for _rows, _columns in BOARD_SIZES:
+    cases[f"explosion_chain/{_rows}x{_columns}"] = _explosion_case(_rows, _columns)
+
+PACK_LEVELS = 20000
+_pack = {}
+
+def _level_pack():
+    """Path of a PACK_LEVELS level pack of random 5x10 levels, written once to a temporary file."""
+    if "path" not in _pack:
+        from levelpack import write_pack
+        rng = random.Random(0)
+        levels = [(tiles.types, tiles.hardness) for tiles in (generate_tiles(rng=rng) for _ in range(PACK_LEVELS))]
+        directory = tempfile.mkdtemp()
+        atexit.register(shutil.rmtree, directory, True)
+        path = os.path.join(directory, "bench.slp")
+        write_pack(path, levels)
+        _pack["path"] = path
+    return _pack["path"]
+
+@case(f"levelpack/open_and_load/{PACK_LEVELS}_levels")
+def levelpack_open_and_load(number):
+    """Opening a large level pack and loading one level from its middle into a TileGrid."""
+    from levelpack import LevelPack
+    path = _level_pack()
+    start = time.perf_counter()
+    for i in range(number):
+        with LevelPack(path) as pack:
+            pack.load((PACK_LEVELS // 2 + i) % PACK_LEVELS)
+    return time.perf_counter() - start
+
+_display = {}
+
+def display():
+    """Screen and font shared by the rendering cases, created on first use."""
+    if not _display:
+        pygame.display.init()
+        pygame.font.init()
+        _display["screen"] = pygame.display.set_mode((800, 600))
+        _display["font"] = pygame.font.Font(None, 36)
+    return _display["screen"], _display["font"]
+
+def _playing_session(rows=5):
+    from engine import GameSession, Inputs, world_height
+    session = GameSession(height=world_height(rows), rows=rows, seed=0)  # The session's own rng picks the levels
+    session.start(0)
+    session.step(Inputs(400, True))
+    return session, Inputs
+
+def _playing_renderer(screen, font, session):
+    """SessionRenderer with particle effects hooked up, as scenes.PlayingScene sets them up."""
+    from renderer import SessionRenderer
+    from particles import ParticleSystem
+    renderer = SessionRenderer(screen, font, session)
+    renderer.particles = ParticleSystem(seed=0)
+    session.add_observer(renderer.particles.observe)
+    session.set_log_removals(True)
+    return renderer
+
+@case("frame/full_redraw")
+def frame_full_redraw(number):
+    from screens import draw_session
+    screen, font = display()
+    session, _ = _playing_session()
+    start = time.perf_counter()
+    for _ in range(number):
+        draw_session(screen, font, session)
+    return time.perf_counter() - start
+
+def _frame_case(rows):
+    def run(number):
+        screen, font = display()
+        session, Inputs = _playing_session(rows)
+        renderer = _playing_renderer(screen, font, session)
+        renderer.draw()
+        elapsed = 0.0
+        for _ in range(number):
+            session.step(Inputs(400, False))
+            start = time.perf_counter()
+            renderer.draw()
+            elapsed += time.perf_counter() - start
+        session.close()
+        return elapsed
+    return run
+
+cases["frame/dirty_rects"] = _frame_case(5)
+for _rows in (100, 1000):  # Marathon boards taller than the screen, drawn through the scrolling camera
+    cases[f"frame/scrolling/{_rows}_rows"] = _frame_case(_rows)
+
+@case("particles/chain_explosion")
+def particles_chain_explosion(number):
+    """A 50x40 board of 80% explosives going off: spawning within the budget, then a second of updates and draws."""
+    from particles import ParticleSystem
+    from components import EXPLODED
+    screen, _ = display()
+    board = random_board(50, 40, 1.0, explosive_share=0.8)
+    board.removed = []
+    board.destroy(board.chain_reaction(board.types == EXPLOSIVE), EXPLODED)
+    events = [("tiles_removed",) + batch for batch in board.removed]
+    elapsed = 0.0
+    for _ in range(number):
+        particles = ParticleSystem(seed=0)
+        start = time.perf_counter()
+        particles.observe(None, events)
+        for _ in range(60):
+            particles.observe(None, [])
+            particles.draw(screen)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+@case("frame/menus")
+def frame_menus(number):
+    from screens import draw_main_menu, draw_highscore_screen
+    screen, font = display()
+    highscores = [{"name": f"player{i}", "score": 1000 - i} for i in range(10)]
+    start = time.perf_counter()
+    for _ in range(number):
+        draw_main_menu(screen, font)
+        draw_highscore_screen(screen, font, highscores)
+    return time.perf_counter() - start
+
+def frame_allocations(frames=600, warmup=120):
+    """Allocations of the playing loop (one engine step and one dirty-rect draw) traced with tracemalloc.
+
+    The paddle follows the ball so the game keeps going. Returns the median bytes allocated within a frame
+    and the bytes per frame still allocated at the end of the run.
+    """
+    screen, font = display()
+    session, Inputs = _playing_session()
+    renderer = _playing_renderer(screen, font, session)
+    balls = session.balls
+    inputs = [Inputs(x, True) for x in range(session.width + 1)]  # Built up front, the loop only picks one
+
+    def frame():
+        x = int(balls.x[0]) if balls.count else session.width // 2
+        session.step(inputs[min(max(x, 0), session.width)])
+        renderer.draw()
+
+    for _ in range(warmup):  # Fill caches (fonts, text surfaces, lazily created scratch arrays)
+        frame()
+    per_frame = np.zeros(frames)  # Preallocated, a growing list would count as retained memory
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        for i in range(frames):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            frame()
+            per_frame[i] = tracemalloc.get_traced_memory()[1] - before
+        end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    session.close()
+    return float(np.median(per_frame)), (end - start) / frames
+
+def check_allocations():
+    allocated, retained = frame_allocations()
+    print(f"frame allocations: {allocated:.0f} B peak per frame (budget {FRAME_ALLOC_BUDGET}), "
+          f"{retained:.1f} B retained per frame (budget {FRAME_RETAIN_BUDGET})")
+    if allocated > FRAME_ALLOC_BUDGET or retained > FRAME_RETAIN_BUDGET:
+        print("ALLOCATION BUDGET EXCEEDED")
+        return 1
+    return 0
+
+@case("frame/menus_cached")
+def frame_menus_cached(number):
+    """Idle menu frames through the scene manager, which redraws nothing while the screen is unchanged."""
+    from scenes import SceneManager, MainMenuScene
+    screen, _ = display()
+    scenes = SceneManager(screen)
+    scenes.add("main_menu", MainMenuScene(scenes))
+    scenes.switch("main_menu")
+    scenes.draw(0.0)
+    start = time.perf_counter()
+    for _ in range(number):
+        scenes.draw(0.0)
+    return time.perf_counter() - start
+
+@case("startup/first_menu_frame")
+def startup_first_menu_frame(number):
+    """Launching main.py until its first menu frame is on screen, in a fresh interpreter each time."""
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py"), "--quit-after-first-frame"]
+    elapsed = 0.0
+    for _ in range(number):
+        launched = time.time()
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        elapsed += float(output.split()[-1]) - launched
+    return elapsed
+
+def measure(function, repeats, min_time=0.05):
+    """Seconds per iteration: median and best over repeats, with the iteration count scaled to min_time."""
+    number = 1
+    while function(number) < min_time and number < 1_000_000:
+        number *= 10
+    timings = [function(number) / number for _ in range(repeats)]
+    return {"median_us": statistics.median(timings) * 1e6, "best_us": min(timings) * 1e6, "number": number}
+
+def compare(results, baseline, threshold):
+    """Cases whose median got slower than threshold times the baseline's."""
+    regressions = []
+    for name, result in results.items():
+        if name in baseline:
+            ratio = result["median_us"] / baseline[name]["median_us"]
+            if ratio > threshold:
+                regressions.append((name, ratio))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", "--filter", default="", help="only run cases whose name contains this string")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--save", metavar="FILE", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="JSON baseline to check the results against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    parser.add_argument("--allocs", action="store_true", help="only check the per-frame allocation budget")
+    args = parser.parse_args(argv)
+    if args.allocs:
+        return check_allocations()
+
+    results = {}
+    for name, function in cases.items():
+        if args.filter in name:
+            results[name] = measure(function, args.repeats)
+            print(f"{name:45s} {results[name]['median_us']:12.2f} us  (best {results[name]['best_us']:.2f})")
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        for name, ratio in regressions:
+            print(f"REGRESSION {name}: {ratio:.2f}x slower than baseline")
+        if regressions:
+            return 1
+        print("No regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
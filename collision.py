@@ -0,0 +1,51 @@
+import numpy as np
+
+# Swept (continuous) collision helpers. A box of size (w, h) at (x, y) moves by (dx, dy) during one tick;
+# times are fractions of that move, normals point away from the surface that was hit.
+
+def sweep_boxes(x, y, w, h, dx, dy, lefts, tops, rights, bottoms):
+    """Swept AABB of one moving box against many static boxes given as coordinate arrays.
+
+    Returns (t, nx, ny) arrays, t is the time of first contact in [0, 1] or inf when the box is not hit.
+    Boxes already overlapping the moving box at t=0 are ignored so a ball can always leave a tile.
+    """
+    lefts, tops = np.asarray(lefts, dtype=float), np.asarray(tops, dtype=float)
+    rights, bottoms = np.asarray(rights, dtype=float), np.asarray(bottoms, dtype=float)
+    x_entry, x_exit = _slab(x, w, dx, lefts, rights)
+    y_entry, y_exit = _slab(y, h, dy, tops, bottoms)
+    entry = np.maximum(x_entry, y_entry)
+    exit_ = np.minimum(x_exit, y_exit)
+    hit = (entry <= exit_) & (entry >= 0) & (entry <= 1)
+    x_side = x_entry > y_entry
+    nx = np.where(hit & x_side, -np.sign(dx), 0.0)
+    ny = np.where(hit & ~x_side, -np.sign(dy), 0.0)
+    return np.where(hit, entry, np.inf), nx, ny
+
+def _slab(position, size, delta, lows, highs):
+    """Entry and exit times of the interval [position, position + size) moving by delta against [lows, highs)."""
+    if delta == 0:
+        overlapping = (position + size > lows) & (position < highs)
+        return np.where(overlapping, -np.inf, np.inf), np.where(overlapping, np.inf, -np.inf)
+    first = (lows - size - position) / delta
+    second = (highs - position) / delta
+    return np.minimum(first, second), np.maximum(first, second)
+
+def sweep_walls(x, y, size, dx, dy, left, top, right):
+    """Earliest contact of a moving square with the left, right and top walls as (t, nx, ny), or None."""
+    best = None
+    if dx < 0 and x + dx <= left:
+        best = (max((left - x) / dx, 0.0), 1, 0)
+    elif dx > 0 and x + size + dx >= right:
+        best = (max((right - size - x) / dx, 0.0), -1, 0)
+    if dy < 0 and y + dy <= top:
+        t = max((top - y) / dy, 0.0)
+        if best is None or t < best[0]:
+            best = (t, 0, 1)
+    return best
+
+def sweep_rect(x, y, size, dx, dy, rect):
+    """Earliest contact of a moving square with a pygame Rect as (t, nx, ny), or None."""
+    t, nx, ny = sweep_boxes(x, y, size, size, dx, dy, [rect.left], [rect.top], [rect.right], [rect.bottom])
+    if np.isinf(t[0]):
+        return None
+    return float(t[0]), int(nx[0]), int(ny[0])
@@ -1,6 +1,9 @@
 
 import pygame
 import random
+import numpy as np
+
+from collision import sweep_boxes
 
 # Tile properties dictionary with probabilities
 tile_types = { # implement hardness
@@ -34,50 +37,305 @@ modifiers = {
     9 : {"name":"extra_life"}, #### gain 1 life
     10 : {"name":"lose_life"},  ##### lose 1 life (refresh state to ball being held by paddle)
     11 : {"name":"lower_tiles"}, ##### lower remaining tiles by 1 level (y axis)
-    12 : {"name":"explode_tiles"} #### explodes all explosive tiles
-    13 : {"name":"skip_level"} ##### go to next level
-    14 : {"name":"soften_tiles"} ##### unbreakable tiles become breakable, hard tiles become basic ....
-    15 : {"name":"more_explosives"} ##### increase explosive tiles
+    12 : {"name":"explode_tiles"}, #### explodes all explosive tiles
+    13 : {"name":"skip_level"}, ##### go to next level
+    14 : {"name":"soften_tiles"}, ##### unbreakable tiles become breakable, hard tiles become basic ....
+    15 : {"name":"more_explosives"}, ##### increase explosive tiles
     16 : {"name":"2x_score"} ##### double score for --:--
 }
 
-# Function to handle the explosion effect by marking adjacent tiles for removal
-def apply_explosion_effect(tile_index, tiles, columns, rows, tiles_to_remove, neighborhood=[(-1, 0), (1, 0), (0, -1), (0, 1)]):
-    x, y = tile_index % columns, tile_index // columns
-    adjacent_indices = [
-        (x + dx, y + dy)
-        for dx, dy in neighborhood
-        if 0 <= x + dx < columns and 0 <= y + dy < rows
-    ]
+# Neighborhoods used by explosive tiles and fire balls, as (d_row, d_col) offsets
+EXPLOSION_NEIGHBORHOOD = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+FIRE_NEIGHBORHOOD = EXPLOSION_NEIGHBORHOOD + [(1, 1), (1, -1), (-1, 1), (-1, -1)]
 
-    for adj_x, adj_y in adjacent_indices:
-        adj_index = adj_y * columns + adj_x
-        if adj_index < len(tiles):
-            _, tile_type = tiles[adj_index]
-            tiles_to_remove.add(adj_index)  # Mark adjacent tiles for removal
+# Per-type lookup tables so whole-board operations can index them with the type array
+EMPTY, BASIC, EXPLOSIVE, UNBREAKABLE, HARD = 3, 0, 1, 2, 4
+TILE_HEIGHT = 30
+CHUNK_ROWS, CHUNK_COLS = 8, 16  # Cells per board chunk, the unit of the occupancy index and of chunked rendering
+BROKEN, EXPLODED, BURNED = 0, 1, 2  # Why tiles were removed, see TileGrid.removed
+TYPE_SCORE = np.zeros(max(tile_types) + 1, dtype=np.int32)
+TYPE_HARDNESS = np.zeros(max(tile_types) + 1, dtype=np.int8)  # -1 means unbreakable
+for _tile_type, _properties in tile_types.items():
+    TYPE_SCORE[_tile_type] = _properties["score"]
+    TYPE_HARDNESS[_tile_type] = -1 if _properties["hardness"] is None else _properties["hardness"]
 
-def fire_ball_collision(tile_index, tiles, columns, rows, tiles_to_remove):
-    return apply_explosion_effect(tile_index, tiles, columns, rows, tiles_to_remove, [(-1, 0), (1, 0), (0, -1), (0, 1),(1,1),(1,-1),(-1,1),(-1,-1)])
+class TileGrid:
+    """Tiles of a level stored as (rows, columns) arrays of type, hardness and score.
 
-# Generate tiles for a level
-def generate_tiles(rows=5, columns=10, width=800, margin=20, score_padding=40):
-    TILE_WIDTH = (width - 2 * margin) // columns
-    TILE_HEIGHT = 30
+    The number of breakable tiles left is kept up to date by every method that changes the board, so
+    checking whether a level is cleared doesn't scan it. So is chunk_counts, the number of tiles in each
+    CHUNK_ROWS x CHUNK_COLS chunk, which lets queries and the renderer skip empty parts of large boards.
+    """
+    def __init__(self, rows, columns, tile_width, tile_height, left, top):
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.left = left
+        self.top = top
+        self.types = np.full((rows, columns), EMPTY, dtype=np.int8)
+        self.hardness = np.zeros((rows, columns), dtype=np.int8)
+        self.score = np.zeros((rows, columns), dtype=np.int32)
+        self.breakable = 0  # Tiles that are neither empty nor unbreakable
+        self.chunk_counts = np.zeros((-(-rows // CHUNK_ROWS), -(-columns // CHUNK_COLS)), dtype=np.int32)
+        self.removed = None  # When a list, removals are logged to it as (cause, x, y, types) batches, see _log_removed
+        self._blast_queue = self._blast_slots = None  # Scratch of chain_reaction, one entry per cell of the padded board
+
+    @property
+    def rows(self):
+        return self.types.shape[0]
+
+    @property
+    def columns(self):
+        return self.types.shape[1]
+
+    def fill(self, type_map, hardness=None):
+        """Replace the whole board with an array of tile types, with their default hardness unless given."""
+        self.types = np.asarray(type_map, dtype=np.int8).copy()
+        self.hardness = TYPE_HARDNESS[self.types] if hardness is None else np.asarray(hardness, dtype=np.int8).copy()
+        self.score = TYPE_SCORE[self.types]
+        self._count_breakable()
+        self._count_chunks()
+
+    def _log_removed(self, cause, mask):
+        """Log the tiles in mask, which are about to be removed, with their centers in world coordinates."""
+        rows, cols = np.nonzero(mask)
+        if len(rows):
+            self.removed.append((cause, self.left + (cols + 0.5) * self.tile_width,
+                                 self.top + (rows + 0.5) * self.tile_height, self.types[rows, cols]))
+
+    def _count_breakable(self):
+        self.breakable = int(np.count_nonzero(self.hardness > 0))
+
+    def _count_chunks(self):
+        rows, columns = self.types.shape
+        chunk_rows, chunk_cols = -(-rows // CHUNK_ROWS), -(-columns // CHUNK_COLS)
+        occupied = np.zeros((chunk_rows * CHUNK_ROWS, chunk_cols * CHUNK_COLS), dtype=np.int32)
+        occupied[:rows, :columns] = self.types != EMPTY
+        self.chunk_counts = occupied.reshape(chunk_rows, CHUNK_ROWS, chunk_cols, CHUNK_COLS).sum(axis=(1, 3), dtype=np.int32)
+
+    def _uncount_chunks(self, removed):
+        rows, cols = np.nonzero(removed)
+        chunks = (rows // CHUNK_ROWS) * self.chunk_counts.shape[1] + cols // CHUNK_COLS
+        self.chunk_counts -= np.bincount(chunks, minlength=self.chunk_counts.size).reshape(self.chunk_counts.shape)
+
+    def chunk_slice(self, chunk):
+        """(rows, columns) slices of the cells in chunk (chunk row, chunk column)."""
+        chunk_row, chunk_col = chunk
+        return (slice(chunk_row * CHUNK_ROWS, min((chunk_row + 1) * CHUNK_ROWS, self.rows)),
+                slice(chunk_col * CHUNK_COLS, min((chunk_col + 1) * CHUNK_COLS, self.columns)))
+
+    def rect(self, cell):
+        row, col = cell
+        return pygame.Rect(self.left + col * self.tile_width, self.top + row * self.tile_height, self.tile_width, self.tile_height)
+
+    def set_type(self, cell, tile_type):
+        self.breakable += int(TYPE_HARDNESS[tile_type] > 0) - int(self.hardness[cell] > 0)
+        self.chunk_counts[cell[0] // CHUNK_ROWS, cell[1] // CHUNK_COLS] += int(tile_type != EMPTY) - int(self.types[cell] != EMPTY)
+        self.types[cell] = tile_type
+        self.hardness[cell] = TYPE_HARDNESS[tile_type]
+        self.score[cell] = TYPE_SCORE[tile_type]
+
+    def remove(self, cell):
+        self.set_type(cell, EMPTY)
+
+    def occupied(self):
+        return self.types != EMPTY
+
+    def cleared(self):
+        """True when only unbreakable tiles (or none at all) remain."""
+        return self.breakable == 0
+
+    def cells_overlapping(self, rect):
+        """Occupied cells touched by rect, in row-major order."""
+        first_col = max((rect.left - self.left) // self.tile_width, 0)
+        last_col = min((rect.right - 1 - self.left) // self.tile_width, self.columns - 1)
+        first_row = max((rect.top - self.top) // self.tile_height, 0)
+        last_row = min((rect.bottom - 1 - self.top) // self.tile_height, self.rows - 1)
+        if first_row > last_row or first_col > last_col:
+            return []
+        rows, cols = np.nonzero(self.types[first_row:last_row + 1, first_col:last_col + 1] != EMPTY)
+        return [(first_row + int(row), first_col + int(col)) for row, col in zip(rows, cols)]
+
+    def sweep(self, x, y, size, dx, dy):
+        """Earliest occupied cell hit by a square at (x, y) moving by (dx, dy) as (t, cell, nx, ny), or None.
+
+        Only the cells under the bounding box of the whole move are tested, in one vectorized query.
+        """
+        first_col = max(int((min(x, x + dx) - self.left) // self.tile_width), 0)
+        last_col = min(int((max(x, x + dx) + size - self.left) // self.tile_width), self.columns - 1)
+        first_row = max(int((min(y, y + dy) - self.top) // self.tile_height), 0)
+        last_row = min(int((max(y, y + dy) + size - self.top) // self.tile_height), self.rows - 1)
+        if first_row > last_row or first_col > last_col:
+            return None
+        if not self.chunk_counts[first_row // CHUNK_ROWS:last_row // CHUNK_ROWS + 1,
+                                 first_col // CHUNK_COLS:last_col // CHUNK_COLS + 1].any():
+            return None
+        rows, cols = np.nonzero(self.types[first_row:last_row + 1, first_col:last_col + 1] != EMPTY)
+        if not len(rows):
+            return None
+        rows, cols = rows + first_row, cols + first_col
+        lefts = self.left + cols * self.tile_width
+        tops = self.top + rows * self.tile_height
+        t, nx, ny = sweep_boxes(x, y, size, size, dx, dy, lefts, tops, lefts + self.tile_width, tops + self.tile_height)
+        i = int(np.argmin(t))
+        if np.isinf(t[i]):
+            return None
+        return float(t[i]), (int(rows[i]), int(cols[i])), int(nx[i]), int(ny[i])
+
+    def neighborhood_mask(self, mask, neighborhood=EXPLOSION_NEIGHBORHOOD):
+        """Occupied cells lying at one of the neighborhood offsets from any cell in mask."""
+        result = np.zeros_like(mask)
+        rows, columns = mask.shape
+        for d_row, d_col in neighborhood:
+            # result[r, c] |= mask[r - d_row, c - d_col], clipped to the board
+            result[max(d_row, 0):rows + min(d_row, 0), max(d_col, 0):columns + min(d_col, 0)] |= \
+                mask[max(-d_row, 0):rows - max(d_row, 0), max(-d_col, 0):columns - max(d_col, 0)]
+        return result & self.occupied()
+
+    def cell_mask(self, cell):
+        mask = np.zeros(self.types.shape, dtype=bool)
+        mask[cell] = True
+        return mask
 
-    # Generate a list of tile types weighted by their probabilities
-    tile_choices = [tile_type for tile_type, properties in tile_types.items()
-                    for _ in range(int(properties["probability"] * 100))]
+    def chain_reaction(self, mask, neighborhood=EXPLOSION_NEIGHBORHOOD):
+        """Mask of every tile destroyed when the explosive tiles in mask detonate.
 
-    tile_map = [[random.choice(tile_choices) for _ in range(columns)] for _ in range(rows)]
-    return [(pygame.Rect(col * TILE_WIDTH + margin, row * TILE_HEIGHT + score_padding + margin, TILE_WIDTH, TILE_HEIGHT), tile_map[row][col])
-            for row in range(rows) for col in range(columns) if tile_map[row][col] != 3]  # Exclude empty tiles from generation
+        A detonating explosive destroys the occupied cells of its neighborhood, and explosives among them
+        detonate in turn. The blast spreads breadth-first, one wave per pass, over flat indices into a copy
+        of the board padded with an empty border, so neighbors are fixed index offsets without bounds checks.
+        Every explosive enters the queue at most once, so the work is bounded by the size of the blast, not
+        the board, and the whole chain is returned for a single destroy().
+        """
+        rows, columns = self.types.shape
+        width = columns + 2
+        intact = np.zeros((rows + 2, width), dtype=bool)  # Tiles the blast hasn't reached, the border stays False
+        fuse = np.zeros((rows + 2, width), dtype=bool)  # Explosive tiles
+        np.not_equal(self.types, EMPTY, out=intact[1:-1, 1:-1])
+        np.equal(self.types, EXPLOSIVE, out=fuse[1:-1, 1:-1])
+        intact_flat, fuse_flat = intact.ravel(), fuse.ravel()
+        if self._blast_queue is None or len(self._blast_queue) != intact_flat.size:
+            self._blast_queue = np.empty(intact_flat.size, dtype=np.intp)
+            self._blast_slots = np.empty(intact_flat.size, dtype=np.intp)
+        queue, slots = self._blast_queue, self._blast_slots
+
+        seed_rows, seed_cols = np.nonzero(mask & fuse[1:-1, 1:-1])
+        seeds = (seed_rows + 1) * width + seed_cols + 1
+        intact_flat[seeds] = False
+        queue[:len(seeds)] = seeds
+        head, tail = 0, len(seeds)
+        offsets = np.array([d_row * width + d_col for d_row, d_col in neighborhood], dtype=np.intp)
+        while head < tail:
+            wave = queue[head:tail]
+            head = tail
+            cells = (wave[:, None] + offsets).ravel()
+            cells = cells[intact_flat[cells]]
+            intact_flat[cells] = False
+            explosive = cells[fuse_flat[cells]]
+            # Keep one copy of explosives reached from several cells of the wave: the last write per cell wins
+            order = np.arange(len(explosive))
+            slots[explosive] = order
+            explosive = explosive[slots[explosive] == order]
+            queue[tail:tail + len(explosive)] = explosive
+            tail += len(explosive)
+        return (self.types != EMPTY) & ~intact[1:-1, 1:-1]
+
+    def hit(self, mask):
+        """Take one point of hardness off every breakable tile in mask and return the score earned.
+
+        Tiles that reach zero hardness are removed, hard tiles left with one point become basic tiles.
+        """
+        mask = mask & (self.hardness > 0)
+        gained = int(self.score[mask].sum())
+        self.hardness[mask] -= 1
+        removed = mask & (self.hardness == 0)
+        if self.removed is not None:
+            self._log_removed(BROKEN, removed)
+        self.breakable -= int(np.count_nonzero(removed))
+        self._uncount_chunks(removed)
+        self.types[removed] = EMPTY
+        softened = mask & (self.types == HARD) & (self.hardness == TYPE_HARDNESS[BASIC])
+        self.types[softened] = BASIC
+        self.score[softened] = TYPE_SCORE[BASIC]
+        self.score[self.types == EMPTY] = 0
+        return gained
+
+    def destroy(self, mask, cause=BROKEN):
+        """Remove every tile in mask regardless of hardness and return the score earned."""
+        mask = mask & self.occupied()
+        if self.removed is not None:
+            self._log_removed(cause, mask)
+        gained = int(self.score[mask].sum())
+        self.breakable -= int(np.count_nonzero(self.hardness[mask] > 0))
+        self._uncount_chunks(mask)
+        self.types[mask] = EMPTY
+        self.hardness[mask] = 0
+        self.score[mask] = 0
+        return gained
+
+    # Board-wide modifiers, see components.modifiers
+    def explode_all(self):
+        """Detonate every explosive tile along with its neighbors."""
+        return self.destroy(self.chain_reaction(self.types == EXPLOSIVE), EXPLODED)
+
+    def soften(self):
+        """Unbreakable tiles become hard tiles and hard tiles become basic tiles."""
+        unbreakable, hard = self.types == UNBREAKABLE, self.types == HARD
+        self.types[unbreakable] = HARD
+        self.types[hard] = BASIC
+        self.hardness = TYPE_HARDNESS[self.types]
+        self.score = TYPE_SCORE[self.types]
+        self._count_breakable()
+
+    def lower(self, rows=1):
+        """Move every tile down by rows. The board scrolls as a whole, no tile data is moved."""
+        self.top += rows * self.tile_height
+
+    def more_explosives(self, probability=0.25, rng=np.random):
+        """Turn each basic tile into an explosive one with the given probability."""
+        converted = (self.types == BASIC) & (rng.random(self.types.shape) < probability)
+        self.types[converted] = EXPLOSIVE
+        self.hardness[converted] = TYPE_HARDNESS[EXPLOSIVE]
+        self.score[converted] = TYPE_SCORE[EXPLOSIVE]
+
+    def __iter__(self):
+        rows, cols = np.nonzero(self.occupied())
+        return ((self.rect((row, col)), int(self.types[row, col])) for row, col in zip(rows, cols))
+
+    def __len__(self):
+        return int(np.count_nonzero(self.occupied()))
+
+class TileSampler:
+    """Draws tile types with tile_types' probabilities. The weights are prepared once, sampling is vectorized."""
+    def __init__(self, tile_types=tile_types):
+        self.types = np.array(list(tile_types), dtype=np.int8)
+        weights = np.array([int(properties["probability"] * 100) for properties in tile_types.values()], dtype=float)
+        self.cumulative = np.cumsum(weights) / weights.sum()
+
+    def sample(self, shape, rng=random):
+        """Array of random tile types; rng is anything with getrandbits, e.g. a seeded random.Random."""
+        draws = np.random.default_rng(rng.getrandbits(64)).random(shape)
+        return self.types[np.minimum(self.cumulative.searchsorted(draws, side="right"), len(self.types) - 1)]
+
+TILE_SAMPLER = TileSampler()
+
+# Generate tiles for a level
+def empty_tiles(rows=5, columns=10, width=800, margin=20, score_padding=40):
+    """Empty TileGrid laid out like every level: tiles span the screen width below the score line."""
+    return TileGrid(rows, columns, (width - 2 * margin) // columns, TILE_HEIGHT, margin, score_padding + margin)
+
+def generate_tiles(rows=5, columns=10, width=800, margin=20, score_padding=40, rng=random, sampler=TILE_SAMPLER):
+    """Random level, pass a seeded random.Random as rng to make it reproducible."""
+    tiles = empty_tiles(rows, columns, width, margin, score_padding)
+    tiles.fill(sampler.sample((rows, columns), rng))  # Empty cells stay type 3
+    return tiles
 
 # Paddle class
 class Paddle: ##################################### adjust paddle size with modifiers
     def __init__(self, x, y, width=100, height=10, color=(0, 0, 255)):
         self.rect = pygame.Rect(x - width // 2, y, width, height)
+        self.base_width = width  # Width without grow_paddle/shrink_paddle
         self.color = color
         self.magnetic = False  # Magnetic state initially off
+        self.pistol = False  # Clicks fire bullets upwards, see projectiles.ProjectilePool
 
     def enable_magnetic(self):
         """Enable magnetic state to hold the ball."""
@@ -87,13 +345,24 @@ class Paddle: ##################################### adjust paddle size with modi
         """Release magnetic state, allowing the ball to move freely."""
         self.magnetic = False
 
+    def set_width(self, width):
+        """Resize the paddle around its center."""
+        centerx = self.rect.centerx
+        self.rect.width = width
+        self.rect.centerx = centerx
+
     def move(self, x, screen_width):
         """Move the paddle based on the mouse x-coordinate, constrained within screen bounds."""
-        self.rect.centerx = x
-        self.rect.clamp_ip(pygame.Rect(0, 0, screen_width, screen_width))
+        rect = self.rect
+        rect.centerx = x
+        # Clamped by hand, clamp_ip would need a new bounds Rect every tick
+        if rect.right > screen_width:
+            rect.right = screen_width
+        if rect.left < 0:
+            rect.left = 0
 
     def draw(self, surface):
-        pygame.draw.rect(surface, self.color, self.rect)
+        return pygame.draw.rect(surface, self.color, self.rect)
 
     def reset_position(self, x, y):
         self.rect.centerx = x
@@ -101,7 +370,8 @@ class Paddle: ##################################### adjust paddle size with modi
         self.enable_magnetic()  # Reset to magnetic at start of level or life loss
 
 
-# Ball class
+# Ball class, the game plays with balls.BallSystem. Ball is only kept as the reference bench.py measures
+# the batched collision against, so leave it as it is rather than extending it
 class Ball: #################################### adjust ball speed with modifiers
     def __init__(self, x, y, size=10, speed=5, color=(255, 255, 255), sharp=False):
         self.rect = pygame.Rect(x, y, size, size)
@@ -128,39 +398,31 @@ class Ball: #################################### adjust ball speed with modifier
             if self.rect.colliderect(paddle.rect):
                 self.dy = -self.dy ####################### adjust mechanics (guide ball reflection using distance of collision from paddle center)
 
-    def check_collision_with_tiles(self, tiles, tile_types, columns, rows):
-        tiles_to_remove = set()  # Use a set to track tiles for removal after collision checks
+    def check_collision_with_tiles(self, tiles, tile_types):
+        tiles_to_remove = np.zeros(tiles.types.shape, dtype=bool)  # Mask of tiles to remove after collision checks
 
-        for i, (tile, tile_type) in enumerate(tiles):
-            if self.rect.colliderect(tile):
-                if tile_type == 2:  # Unbreakable tile, only reflects the ball
-                    self.last_tile_score = 0
+        for cell in tiles.cells_overlapping(self.rect):
+            tile_type = tiles.types[cell]
+            if tile_type == 2:  # Unbreakable tile, only reflects the ball
+                self.last_tile_score = 0
+                self.dy = -self.dy
+                return False
+            elif tile_type == 1:  # Explosive tile, neighboring explosives go off with it
+                tiles_to_remove |= tiles.chain_reaction(tiles.cell_mask(cell))
+                if not self.sharp:  # Only reflect the ball if it's not sharp
                     self.dy = -self.dy
-                    return False
-                elif tile_type == 1:  # Explosive tile
-                    apply_explosion_effect(i, tiles, columns, rows, tiles_to_remove)
-                    tiles_to_remove.add(i)  # Add explosive tile itself for removal
-                    if not self.sharp:  # Only reflect the ball if it's not sharp
-                        self.dy = -self.dy
-                    break  # Break after handling the explosive tile collision
-                elif tile_type == 4:  # Steel, turns into basic tile
-                    tiles[i] = (tile, 0)  # Change steel tile to basic tile
-                    self.last_tile_score = tile_types[4]["score"]
-                    return True
-                else:
-                    # Basic destructible tiles
-                    self.last_tile_score = tile_types[tile_type]["score"]
-                    tiles_to_remove.add(i)
-                    self.dy = -self.dy  # Reflect the ball on collision
-                    break  # Exit after handling one collision
+                break  # Break after handling the explosive tile collision
+            else:
+                # Basic and hard tiles lose one hardness point, hard tiles turn into basic tiles
+                self.last_tile_score = tiles.hit(tiles.cell_mask(cell))
+                self.dy = -self.dy  # Reflect the ball on collision
+                return True
 
         # Remove marked tiles after all collision checks
-        for index in sorted(tiles_to_remove, reverse=True):
-            try:
-                del tiles[index]
-            except IndexError:
-                print("IndexError: Attempted to delete a tile that doesn’t exist.")
-        return bool(tiles_to_remove)  # Return True if any tiles were removed
+        if tiles_to_remove.any():
+            self.last_tile_score = tiles.destroy(tiles_to_remove)
+            return True
+        return False
 
     def bottom_out_of_bounds(self, screen_height, margin):
         return self.rect.bottom >= screen_height - margin
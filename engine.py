@@ -0,0 +1,238 @@
+import random
+from collections import namedtuple
+
+import numpy as np
+
+from balls import BallSystem
+from components import Paddle, TILE_SAMPLER, TILE_HEIGHT
+from levels import LevelProvider
+from projectiles import ProjectilePool
+from scheduler import EffectScheduler, TIMED_MODIFIERS
+
+TICK_RATE = 60  # Simulation ticks per second, all speeds are in pixels per tick
+MAX_TICKS_PER_FRAME = 5  # Under load, simulated time beyond this many ticks per rendered frame is dropped
+PLAY_SPACE = 390  # World height below the board for paddle and ball, as in the 800x600 layout with 5 rows
+
+# Player input for one simulation tick: paddle target x and whether the button was clicked
+Inputs = namedtuple("Inputs", ["mouse_x", "clicked"])
+
+def world_height(rows, margin=20, score_padding=40, screen_height=600):
+    """Height of a world that fits a board of rows tile rows, at least the screen's. Taller worlds scroll."""
+    return max(screen_height, margin + score_padding + rows * TILE_HEIGHT + PLAY_SPACE)
+
+class FixedTimestep:
+    """Accumulates real frame time and tells the loop how many fixed simulation ticks to run.
+
+    When rendering falls behind, several ticks run per frame (frames are skipped). If even that can't keep up,
+    the backlog past max_ticks_per_frame is dropped so the game slows down instead of spiralling.
+    """
+    def __init__(self, tick_rate=TICK_RATE, max_ticks_per_frame=MAX_TICKS_PER_FRAME):
+        self.tick_time = 1.0 / tick_rate
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.accumulator = 0.0
+        self.dropped_ticks = 0
+
+    def reset(self):
+        self.accumulator = 0.0
+
+    def advance(self, frame_time):
+        """Add frame_time seconds and return the number of ticks to simulate now."""
+        self.accumulator += frame_time
+        ticks = int(self.accumulator / self.tick_time)
+        if ticks > self.max_ticks_per_frame:
+            self.dropped_ticks += ticks - self.max_ticks_per_frame
+            ticks = self.max_ticks_per_frame
+            self.accumulator = ticks * self.tick_time
+        self.accumulator -= ticks * self.tick_time
+        return ticks
+
+    @property
+    def alpha(self):
+        """How far the render time lies between the last two simulated states, in [0, 1)."""
+        return self.accumulator / self.tick_time
+
+
+class GameSession:
+    """Game rules for one player: paddle, balls, tiles, score, lives and level. No rendering, no clock.
+
+    width and height are the size of the world, levels have rows rows of tiles. For boards that don't fit
+    the screen, make the world taller with world_height() and let the renderer's camera scroll it.
+    Levels are random unless a levelpack.LevelPack is given as level_pack; its levels bring their own size.
+    """
+    def __init__(self, width=800, height=600, margin=20, score_padding=40, lives=3, seed=None, prefetch_levels=True,
+                 ball_speed=5, tile_sampler=TILE_SAMPLER, rows=5, level_pack=None):
+        self.width = width
+        self.height = height
+        self.rows = rows
+        self.margin = margin
+        self.score_padding = score_padding
+        self.start_lives = lives
+        self.paddle = Paddle(width // 2, height - 50)
+        self.prev_paddle_x = self.paddle.rect.x  # Paddle position before the last step, for render interpolation
+        self.balls = BallSystem(speed=ball_speed)
+        self.projectiles = ProjectilePool()
+        self.effects = EffectScheduler(TICK_RATE)  # Timed modifiers, expiring on self.ticks
+        self.tiles = None
+        self.levels = None  # LevelProvider of the current game
+        self.prefetch_levels = prefetch_levels  # Build the next level on a worker thread
+        self.tile_sampler = tile_sampler
+        self.level_pack = level_pack
+        self.seed = seed
+        self.rng = random.Random(seed)  # All randomness of a game comes from here, so a seed replays it exactly
+        self.score, self.lives, self.level = 0, lives, 1
+        self.game_over = False
+        self.ticks = 0
+        self.observers = []  # Called as observer(session, events) after every step
+        self.profiler = None  # Optional profiler.PhaseProfiler, see set_profiler
+        self.log_removals = False  # Report removed tiles as events, see set_log_removals
+
+    def add_observer(self, observer):
+        self.observers.append(observer)
+
+    def remove_observer(self, observer):
+        self.observers.remove(observer)
+
+    def set_profiler(self, profiler):
+        """Time the phases of step() with a profiler.PhaseProfiler, or stop with None."""
+        self.profiler = self.balls.profiler = profiler
+
+    def set_log_removals(self, enabled):
+        """Report every removed tile in a ("tiles_removed", cause, x, y, types) event, e.g. for particle effects.
+
+        cause is components.BROKEN, EXPLODED or BURNED, x and y are arrays of tile centers in world coordinates.
+        """
+        self.log_removals = enabled
+        if self.tiles is not None:
+            self.tiles.removed = [] if enabled else None
+
+    def _load_level(self):
+        self.tiles = self.levels.get(self.level)
+        self.tiles.removed = [] if self.log_removals else None
+
+    def start(self, seed=None):
+        """Start a new game from level 1, seeded with seed if given."""
+        if seed is not None:
+            self.seed = seed
+            self.rng.seed(seed)
+        if self.levels is not None:
+            self.levels.close()
+        self.levels = LevelProvider(self.rng.getrandbits(32), rows=self.rows, width=self.width, margin=self.margin,
+                                    score_padding=self.score_padding, background=self.prefetch_levels,
+                                    sampler=self.tile_sampler, pack=self.level_pack)
+        self.score, self.lives, self.level = 0, self.start_lives, 1
+        self._load_level()
+        self.paddle.reset_position(self.width // 2, self.height - 50)
+        self.prev_paddle_x = self.paddle.rect.x
+        self.paddle.pistol = False
+        self.balls.reset(self.width // 2, self.height - 50)
+        self.projectiles.clear()
+        self.effects.clear()
+        self._apply_multipliers()
+        self.game_over = False
+        self.ticks = 0
+
+    def step(self, inputs):
+        """Advance the game by one tick and return the events that happened in it."""
+        events = []
+        if self.game_over:
+            return events
+
+        self.prev_paddle_x = self.paddle.rect.x
+        expired = self.effects.advance(self.ticks)
+        if expired:
+            self._apply_multipliers()
+            events.extend(("effect_expired", name) for name in expired)
+
+        # Release the balls from magnetic paddle on click, or fire the pistol once they are in play
+        if inputs.clicked and self.balls.any_attached():
+            self.paddle.release_magnetic()
+            self.balls.release()
+        elif inputs.clicked and self.paddle.pistol:
+            self.projectiles.fire(self.paddle.rect.left + 5, self.paddle.rect.top)
+            self.projectiles.fire(self.paddle.rect.right - 5, self.paddle.rect.top)
+
+        profiler = self.profiler
+        if profiler:
+            profiler.mark("paddle_move")
+        self.paddle.move(inputs.mouse_x, self.width)
+        if profiler:
+            profiler.mark("ball_move")
+        gained, _ = self.balls.step(self.width, self.height, self.margin, self.score_padding, self.paddle, self.tiles)
+        if profiler:
+            profiler.mark("projectiles")
+        gained += self.projectiles.step(self.tiles, self.score_padding + self.margin)
+        if gained:
+            gained = round(gained * self.effects.multiplier("score"))
+            self.score += gained
+            events.append(("tile_hit", gained))
+        removed = self.tiles.removed
+        if removed:  # Also picks up removals by modifiers applied since the last step
+            events.extend(("tiles_removed",) + batch for batch in removed)
+            removed.clear()
+
+        if profiler:
+            profiler.mark("rules")
+
+        # A life is only lost once the last ball is gone
+        if self.balls.count == 0:
+            self.lives -= 1
+            if self.lives > 0:
+                self.balls.reset(self.width // 2, self.height - 50)
+                self.paddle.enable_magnetic()
+                events.append(("life_lost", self.lives))
+            else:
+                self.game_over = True
+                events.append(("game_over", self.score))
+
+        # Check if only unbreakable tiles remain
+        if not self.game_over and self.tiles.cleared():
+            self.level += 1  # Advance level
+            self._load_level()  # Usually built in the background while this level was played
+            self.balls.reset(self.width // 2, self.height - 50)
+            self.projectiles.clear()
+            events.append(("level_up", self.level))
+
+        self.ticks += 1
+        for observer in self.observers:
+            observer(self, events)
+        return events
+
+    def close(self):
+        """Stop the level worker thread."""
+        if self.levels is not None:
+            self.levels.close()
+
+    def _apply_multipliers(self):
+        """Push the combined timed-modifier multipliers into the balls and the paddle."""
+        self.balls.set_speed_scale(self.effects.multiplier("ball_speed"))
+        self.paddle.set_width(round(self.paddle.base_width * self.effects.multiplier("paddle_width")))
+
+    def apply_modifier(self, name):
+        """Apply one of the modifiers from components.modifiers that the engine supports."""
+        if name in TIMED_MODIFIERS:
+            self.effects.apply(name, self.ticks)
+            self._apply_multipliers()
+        elif name == "multiply_ball":
+            self.balls.multiply()
+        elif name == "sharp_ball":
+            self.balls.set_property("sharp")
+        elif name == "fire_ball":
+            self.balls.set_property("fire")
+        elif name == "pistol_paddle":
+            self.paddle.pistol = True
+        elif name == "extra_life":
+            self.lives += 1
+        elif name == "explode_tiles":
+            self.score += round(self.tiles.explode_all() * self.effects.multiplier("score"))
+        elif name == "soften_tiles":
+            self.tiles.soften()
+        elif name == "lower_tiles":
+            self.tiles.lower()
+        elif name == "skip_level":
+            self.level += 1
+            self._load_level()
+            self.balls.reset(self.width // 2, self.height - 50)
+        elif name == "more_explosives":
+            self.tiles.more_explosives(rng=np.random.default_rng(self.rng.getrandbits(64)))
+        else:
+            raise ValueError(f"Unsupported modifier: {name}")
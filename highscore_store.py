@@ -0,0 +1,109 @@
+import bisect
+import json
+import os
+import tempfile
+
+class JsonHighscoreStore:
+    """Highscores in the plain highscores.json format, kept sorted in memory.
+
+    The file is read once. Inserts use a binary search into the sorted list, top() is a slice, and save()
+    writes a temporary file and renames it over the old one so a crash never leaves a half-written file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._entries = None  # Sorted by score, highest first
+        self._keys = None  # Negated scores, ascending, for bisect
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        if os.path.exists(self.path):
+            with open(self.path, "r") as file:
+                entries = json.load(file)
+        else:
+            entries = []
+        entries.sort(key=lambda x: x["score"], reverse=True)
+        self._entries = entries
+        self._keys = [-entry["score"] for entry in entries]
+
+    def add(self, name, score):
+        self._load()
+        index = bisect.bisect_right(self._keys, -score)  # Equal scores keep their arrival order
+        self._keys.insert(index, -score)
+        self._entries.insert(index, {"name": name, "score": score})
+        self.save()
+
+    def top(self, k=10):
+        self._load()
+        return self._entries[:k]
+
+    def all(self):
+        self._load()
+        return list(self._entries)
+
+    def reset(self):
+        self._entries, self._keys = [], []
+        self.save()
+
+    def save(self):
+        self._load()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False) as file:
+            json.dump(self._entries, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(file.name, self.path)
+
+    def close(self):
+        pass
+
+
+class SqliteHighscoreStore:
+    """Highscores in an SQLite database with an index on score, for cabinets that keep years of scores.
+
+    Inserts go through the score index, SQLite's journal makes every write atomic, and the top entries
+    are cached in memory until the next insert.
+    """
+    def __init__(self, path):
+        import sqlite3  # Only needed by this backend, kept off the startup path of the default JSON store
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS highscores (id INTEGER PRIMARY KEY, name TEXT NOT NULL, score INTEGER NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS highscores_score ON highscores (score DESC, id)")
+        self.connection.commit()
+        self._top = None
+        self._top_k = 0
+
+    def add(self, name, score):
+        with self.connection:
+            self.connection.execute("INSERT INTO highscores (name, score) VALUES (?, ?)", (name, score))
+        self._top = None
+
+    def top(self, k=10):
+        if self._top is None or k > self._top_k:
+            rows = self.connection.execute("SELECT name, score FROM highscores ORDER BY score DESC, id LIMIT ?", (k,))
+            self._top = [{"name": name, "score": score} for name, score in rows]
+            self._top_k = k
+        return self._top[:k]
+
+    def all(self):
+        rows = self.connection.execute("SELECT name, score FROM highscores ORDER BY score DESC, id")
+        return [{"name": name, "score": score} for name, score in rows]
+
+    def reset(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM highscores")
+        self._top = None
+
+    def save(self):
+        pass  # Every insert is already committed
+
+    def close(self):
+        self.connection.close()
+
+
+def open_store(path):
+    """Pick the highscore backend from the file extension: .db/.sqlite for SQLite, anything else is JSON."""
+    if os.path.splitext(path)[1] in (".db", ".sqlite", ".sqlite3"):
+        return SqliteHighscoreStore(path)
+    return JsonHighscoreStore(path)
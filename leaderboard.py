@@ -0,0 +1,141 @@
+"""Central leaderboard service for a fleet of cabinets, small enough to run locally as a stand-in.
+
+    python leaderboard.py --port 8765 --db leaderboard.db
+
+    POST /scores   {"scores": [{"id": ..., "name": ..., "score": ..., "cabinet": ...}, ...]} -> {"accepted": n}
+    GET  /top?k=10 {"scores": [{"name": ..., "score": ...}, ...]}
+
+Score ids are chosen by the cabinet, a batch that is sent again after a lost response is only stored once.
+Connections are kept alive (HTTP/1.1), so a cabinet uploads every batch over the same socket.
+The client is utils.LeaderboardClient.
+"""
+import argparse
+import json
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+MAX_BATCH = 500  # Scores per POST
+MAX_TOP = 100
+MAX_BODY = 1 << 20
+
+class LeaderboardStore:
+    """Scores in SQLite keyed on their id. The top entries are cached in memory until the next insert."""
+    def __init__(self, path):
+        self.lock = threading.Lock()  # One connection shared by the request threads
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS scores (id TEXT PRIMARY KEY, name TEXT NOT NULL, "
+                                "score INTEGER NOT NULL, cabinet TEXT NOT NULL DEFAULT '', seq INTEGER NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS scores_score ON scores (score DESC, seq)")
+        self.connection.commit()
+        self._top = None
+        self._top_k = 0
+
+    def add_batch(self, scores):
+        """Insert (id, name, score, cabinet) tuples in one transaction, ids already stored are skipped."""
+        with self.lock, self.connection:
+            (seq,) = self.connection.execute("SELECT COALESCE(MAX(seq), 0) FROM scores").fetchone()
+            before = self.connection.total_changes
+            self.connection.executemany("INSERT OR IGNORE INTO scores (id, name, score, cabinet, seq) VALUES (?, ?, ?, ?, ?)",
+                                        [(*entry, seq + i) for i, entry in enumerate(scores, 1)])
+            accepted = self.connection.total_changes - before
+            if accepted:
+                self._top = None
+        return accepted
+
+    def top(self, k=10):
+        with self.lock:
+            if self._top is None or k > self._top_k:
+                rows = self.connection.execute("SELECT name, score FROM scores ORDER BY score DESC, seq LIMIT ?", (k,))
+                self._top = [{"name": name, "score": score} for name, score in rows]
+                self._top_k = k
+            return self._top[:k]
+
+    def close(self):
+        self.connection.close()
+
+
+def _parse_scores(body):
+    """(id, name, score, cabinet) tuples of a POST /scores body, ValueError if it is malformed."""
+    scores = json.loads(body)["scores"]
+    if not isinstance(scores, list) or len(scores) > MAX_BATCH:
+        raise ValueError(f"scores must be a list of at most {MAX_BATCH} entries")
+    parsed = []
+    for entry in scores:
+        score_id, name, score, cabinet = entry["id"], entry["name"], entry["score"], entry.get("cabinet", "")
+        if not (isinstance(score_id, str) and isinstance(name, str) and isinstance(cabinet, str)
+                and isinstance(score, int) and not isinstance(score, bool)):
+            raise ValueError("id, name and cabinet must be strings, score an integer")
+        parsed.append((score_id[:64], name[:32], score, cabinet[:64]))
+    return parsed
+
+class LeaderboardHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, every response carries a Content-Length
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != "/top":
+            return self._reply(404, {"error": "not found"})
+        try:
+            k = min(max(int(parse_qs(url.query).get("k", ["10"])[0]), 1), MAX_TOP)
+        except ValueError:
+            return self._reply(400, {"error": "k must be an integer"})
+        self._reply(200, {"scores": self.server.store.top(k)})
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/scores":
+            return self._reply(404, {"error": "not found"})
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            self.close_connection = True  # The body is left unread
+            return self._reply(413, {"error": "batch too large"})
+        try:
+            scores = _parse_scores(self.rfile.read(length))
+        except KeyError as error:
+            return self._reply(400, {"error": f"missing field {error}"})
+        except (ValueError, TypeError) as error:
+            return self._reply(400, {"error": str(error) or "malformed batch"})
+        self._reply(200, {"accepted": self.server.store.add_batch(scores)})
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(host="127.0.0.1", port=8765, db="leaderboard.db", verbose=False):
+    """Leaderboard server bound to (host, port), call serve_forever() on it. Port 0 picks a free one."""
+    server = ThreadingHTTPServer((host, port), LeaderboardHandler)
+    server.daemon_threads = True
+    server.store = LeaderboardStore(db)
+    server.verbose = verbose
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the leaderboard service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default="leaderboard.db", help="SQLite database the scores are kept in")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.db, args.verbose)
+    print(f"Leaderboard on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.store.close()
+
+if __name__ == "__main__":
+    main()
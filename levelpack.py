@@ -0,0 +1,186 @@
+"""Level packs: curated levels in one compact binary file, opened through mmap.
+
+A pack is a header, an index with one entry per level and then the levels' cells, one byte per cell with
+the tile type in the low nibble and its hardness + 1 in the high nibble (0 is unbreakable). Opening a pack
+only reads the header; loading a level reads its index entry and its own cells, so a pack of tens of
+thousands of levels opens instantly and only the pages of the levels played are ever touched.
+
+Levels are authored as text, one character per cell, levels separated by blank lines, # starts a comment:
+
+    . empty   B basic   X explosive   U unbreakable   H hard   2-9 hard tile taking that many hits
+
+or as JSON, a list of levels that are each a list of row strings in the same characters.
+
+    python levelpack.py build levels.txt more_levels.json -o campaign.slp
+    python levelpack.py info campaign.slp
+    python levelpack.py show campaign.slp 3
+"""
+import argparse
+import json
+import mmap
+import struct
+import sys
+
+import numpy as np
+
+from components import empty_tiles, tile_types, TYPE_HARDNESS, EMPTY, BASIC, EXPLOSIVE, UNBREAKABLE, HARD
+
+MAGIC = b"SBLP"
+VERSION = 1
+HEADER = struct.Struct("<4sBxxxIHH")  # magic, version, level count, most rows and most columns of any level
+INDEX = struct.Struct("<QHH")  # Per level: offset of its cells, rows, columns
+TYPE_MASK = 0x0F
+MAX_HARDNESS = 9  # Most hits the text format can write, the four bits stored (hardness + 1) would hold up to 14
+MAX_COLUMNS = 76  # Tiles on the 800 px screen are (800 - 2 * 20) // columns wide, at least the 10 px of a ball
+
+LEGEND = {".": EMPTY, "B": BASIC, "X": EXPLOSIVE, "U": UNBREAKABLE, "H": HARD}
+SYMBOLS = {tile_type: char for char, tile_type in LEGEND.items()}
+
+def parse_level(rows):
+    """(types, hardness) arrays of a level given as row strings in the LEGEND characters."""
+    if not rows or len({len(row) for row in rows}) != 1:
+        raise ValueError("A level needs at least one row and all rows the same length")
+    types = np.full((len(rows), len(rows[0])), EMPTY, dtype=np.int8)
+    hardness = np.zeros(types.shape, dtype=np.int8)
+    for r, row in enumerate(rows):
+        for c, char in enumerate(row):
+            if char in LEGEND:
+                types[r, c] = LEGEND[char]
+                hardness[r, c] = TYPE_HARDNESS[LEGEND[char]]
+            elif char in "23456789":
+                types[r, c], hardness[r, c] = HARD, int(char)
+            else:
+                raise ValueError(f"Unknown tile {char!r} in row {r + 1}")
+    return types, hardness
+
+def format_level(types, hardness):
+    """Row strings of a level, the inverse of parse_level."""
+    rows = []
+    for type_row, hardness_row in zip(types.tolist(), hardness.tolist()):
+        rows.append("".join(str(h) if t == HARD and h != TYPE_HARDNESS[HARD] and 2 <= h <= 9 else SYMBOLS[t]
+                            for t, h in zip(type_row, hardness_row)))
+    return rows
+
+def read_authored(path):
+    """Levels of a text or JSON authoring file as (types, hardness) arrays."""
+    with open(path, encoding="utf-8") as file:
+        text = file.read()
+    if path.endswith(".json"):
+        blocks = json.loads(text)
+    else:
+        blocks, block = [], []
+        for line in text.splitlines() + [""]:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                block.append(line)
+            elif block:
+                blocks.append(block)
+                block = []
+    levels = []
+    for number, rows in enumerate(blocks, 1):
+        try:
+            levels.append(parse_level(rows))
+        except ValueError as error:
+            raise ValueError(f"{path}, level {number}: {error}") from None
+    return levels
+
+def write_pack(path, levels):
+    """Write (types, hardness) arrays as a level pack."""
+    levels = [(np.asarray(types, dtype=np.int8), np.asarray(hardness, dtype=np.int8)) for types, hardness in levels]
+    if not levels:
+        raise ValueError("A level pack needs at least one level")
+    for types, hardness in levels:
+        if types.shape != hardness.shape or types.ndim != 2 or not types.size:
+            raise ValueError("Each level needs non-empty 2D types and hardness arrays of the same shape")
+        if types.shape[1] > MAX_COLUMNS:
+            raise ValueError(f"Levels can be at most {MAX_COLUMNS} columns wide, not {types.shape[1]}")
+        if not np.isin(types, list(tile_types)).all() or types.max() > TYPE_MASK:
+            raise ValueError("Unknown tile type in level")
+        if ((hardness < -1) | (hardness > MAX_HARDNESS)).any():
+            raise ValueError(f"Hardness must be -1 (unbreakable) to {MAX_HARDNESS}")
+    offset = HEADER.size + INDEX.size * len(levels)
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(levels), max(t.shape[0] for t, _ in levels),
+                               max(t.shape[1] for t, _ in levels)))
+        for types, _ in levels:
+            file.write(INDEX.pack(offset, *types.shape))
+            offset += types.size
+        for types, hardness in levels:
+            file.write(((types.astype(np.uint8) & TYPE_MASK) | ((hardness + 1).astype(np.uint8) << 4)).tobytes())
+
+class LevelPack:
+    """A level pack opened read-only through mmap. Levels are numbered from 0."""
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            self._map.close()
+            raise ValueError(f"{path} is not a level pack")
+        magic, version, self.count, self.max_rows, self.max_columns = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} level pack")
+        if not self.count or self.max_columns > MAX_COLUMNS:
+            self._map.close()
+            raise ValueError(f"{path} has no levels or levels wider than {MAX_COLUMNS} columns")
+
+    def __len__(self):
+        return self.count
+
+    def cells(self, index):
+        """(types, hardness) arrays of level index, read from its own bytes only."""
+        if not 0 <= index < self.count:
+            raise IndexError(f"Level {index} is not in the pack ({self.count} levels)")
+        offset, rows, columns = INDEX.unpack_from(self._map, HEADER.size + index * INDEX.size)
+        # Slicing copies just this level's bytes, so no view into the map outlives the call
+        packed = np.frombuffer(self._map[offset:offset + rows * columns], dtype=np.uint8).reshape(rows, columns)
+        return (packed & TYPE_MASK).astype(np.int8), ((packed >> 4).astype(np.int8) - 1)
+
+    def load(self, index, width=800, margin=20, score_padding=40):
+        """Level index as a TileGrid laid out like generated levels."""
+        types, hardness = self.cells(index)
+        tiles = empty_tiles(types.shape[0], types.shape[1], width, margin, score_padding)
+        tiles.fill(types, hardness)
+        return tiles
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and inspect level packs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="convert text/JSON levels into a pack")
+    build.add_argument("sources", nargs="+")
+    build.add_argument("-o", "--output", required=True)
+    info = commands.add_parser("info", help="print a pack's level count and sizes")
+    info.add_argument("pack")
+    show = commands.add_parser("show", help="print one level of a pack in the text format")
+    show.add_argument("pack")
+    show.add_argument("level", type=int)
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "build":
+            levels = [level for source in args.sources for level in read_authored(source)]
+            write_pack(args.output, levels)
+            print(f"{args.output}: {len(levels)} levels")
+        elif args.command == "info":
+            with LevelPack(args.pack) as pack:
+                print(f"{args.pack}: {len(pack)} levels, up to {pack.max_rows} rows x {pack.max_columns} columns")
+        else:
+            with LevelPack(args.pack) as pack:
+                print("\n".join(format_level(*pack.cells(args.level))))
+    except (OSError, ValueError, IndexError) as error:  # Missing files, malformed levels or packs, unknown level
+        print(error, file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
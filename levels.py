@@ -0,0 +1,52 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from components import generate_tiles, TILE_SAMPLER
+
+class LevelProvider:
+    """Hands out the levels of one game and builds level N+1 on a worker thread while level N is played.
+
+    Every level is generated from its own seed derived from the game seed and the level number, so the
+    levels are the same whether they were built ahead of time or on demand. With background=False the
+    levels are built on the calling thread, e.g. when many sessions run side by side.
+
+    With a levelpack.LevelPack as pack, levels are loaded from it in order instead, wrapping around after
+    its last one.
+    """
+    def __init__(self, seed, rows=5, columns=10, width=800, margin=20, score_padding=40, background=True, sampler=TILE_SAMPLER,
+                 pack=None):
+        self.seed = seed
+        self.rows = rows
+        self.columns = columns
+        self.width = width
+        self.margin = margin
+        self.score_padding = score_padding
+        self.sampler = sampler
+        self.pack = pack
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="levels") if background else None
+        self._pending = None  # (level, future) being built ahead
+
+    def build(self, level):
+        """Generate a level from scratch, or load it from the pack."""
+        if self.pack is not None:
+            return self.pack.load((level - 1) % len(self.pack), self.width, self.margin, self.score_padding)
+        rng = random.Random(f"{self.seed}:{level}")
+        return generate_tiles(self.rows, self.columns, self.width, self.margin, self.score_padding, rng=rng, sampler=self.sampler)
+
+    def prefetch(self, level):
+        if self.executor is not None and (self._pending is None or self._pending[0] != level):
+            self._pending = (level, self.executor.submit(self.build, level))
+
+    def get(self, level):
+        """The tiles of level, usually already built, and start building the one after it."""
+        if self._pending is not None and self._pending[0] == level:
+            tiles = self._pending[1].result()
+            self._pending = None
+        else:
+            tiles = self.build(level)
+        self.prefetch(level + 1)
+        return tiles
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,98 +1,89 @@
+import argparse
+import time
 import pygame
-from components import Paddle, Ball, generate_tiles, tile_types
-from screens import draw_main_menu, draw_highscore_screen, draw_score_and_lives
-from utils import load_highscores, save_highscore, reset_highscores
+from scenes import (SceneManager, MainMenuScene, HighscoreScene, ConfirmResetScene, NameEntryScene,
+                    PlayingScene)
+from utils import HighscoreWorker, LeaderboardClient, LEADERBOARD_URL
+from profiler import PhaseProfiler
 
-# Initialize Pygame and set up display
-pygame.init()
+parser = argparse.ArgumentParser(description="Tile Breaker Game")
+parser.add_argument("--record", metavar="FILE", help="record the inputs of each game to FILE for replay.py")
+parser.add_argument("--profile", action="store_true", help="show per-phase frame timings on screen")
+parser.add_argument("--profile-out", metavar="FILE", help="export phase timings on exit, Chrome trace for .json, CSV otherwise")
+parser.add_argument("--rows", type=int, default=5, help="tile rows per level, taller boards scroll with the ball")
+parser.add_argument("--levels", metavar="PACK", help="play the levels of a level pack built with levelpack.py")
+parser.add_argument("--leaderboard", metavar="URL", default=LEADERBOARD_URL,
+                    help="upload scores to and show the top scores of a leaderboard.py service")
+parser.add_argument("--quit-after-first-frame", action="store_true",
+                    help="print the wall-clock time of the first menu frame and quit, for bench.py's startup case")
+args = parser.parse_args()
+
+# Only bring up the display (the mouse comes with it), the font module starts with the first font loaded by
+# screens.get_font. Audio and joysticks are never initialized.
+pygame.display.init()
 WIDTH, HEIGHT = 800, 600
 MARGIN, SCORE_PADDING = 20, 40
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Tile Breaker Game")
-font = pygame.font.Font(None, 36)
 
-# Game states and variables
-game_state = "main_menu"
-running, score, level, lives = True, 0, 1, 3
-highscores = load_highscores()
-paddle = Paddle(WIDTH // 2, HEIGHT - 50)
-ball = Ball(WIDTH // 2, HEIGHT // 2)
-tiles = []
+# Scenes and shared state
+running = True
+leaderboard = LeaderboardClient(args.leaderboard) if args.leaderboard else None  # Uploads on its own thread
+highscore_worker = HighscoreWorker(leaderboard=leaderboard)  # Saves and loads highscores off the game loop
+highscore_worker.refresh()
+profiler = PhaseProfiler(enabled=args.profile or bool(args.profile_out))
+RENDER_FPS = 60  # Render rate cap, the simulation always runs at engine.TICK_RATE
+
+scenes = SceneManager(screen)
+scenes.add("main_menu", MainMenuScene(scenes))
+highscore_scene = scenes.add("highscore", HighscoreScene(scenes))
+scenes.add("confirm_reset", ConfirmResetScene(scenes, highscore_worker))
+playing = scenes.add("playing", PlayingScene(scenes, WIDTH, HEIGHT, MARGIN, SCORE_PADDING, profiler,
+                                             show_profiler=args.profile, record=args.record, rows=args.rows,
+                                             levels=args.levels))
+scenes.add("game_over", NameEntryScene(scenes, highscore_worker, playing))
+scenes.switch("main_menu")
 
 # Main game loop
 clock = pygame.time.Clock()
 while running:
-    screen.fill((0, 0, 0))
+    frame_time = clock.tick(RENDER_FPS) / 1000
+    profiler.begin_frame()
+    profiler.mark("housekeeping")
 
-    # Toggle cursor visibility based on game state
-    if game_state == "playing":
-        pygame.mouse.set_visible(False)
-    else:
-        pygame.mouse.set_visible(True)
+    # Pick up highscores reloaded in the background
+    loaded = highscore_worker.poll()
+    if leaderboard is not None and (leaderboard.top is not None or loaded is None):
+        loaded = leaderboard.poll()  # Once fetched, the global top list is shown instead of the local one
+    if loaded is not None:
+        highscore_scene.set_highscores(loaded)
 
-    # Draw relevant screen based on game state
-    if game_state == "main_menu":
-        start_rect, highscore_rect = draw_main_menu(screen, font)
-    elif game_state == "highscore":
-        reset_rect, back_rect = draw_highscore_screen(screen, font, highscores)
-    elif game_state == "playing":
-        paddle.move(pygame.mouse.get_pos()[0], WIDTH)
-        ball.move(WIDTH, HEIGHT, MARGIN, SCORE_PADDING, paddle)
-        if ball.check_collision_with_tiles(tiles, tile_types, columns=10, rows=5):
-            score += ball.last_tile_score
+    dirty_rects = scenes.draw(frame_time)
 
-        if ball.bottom_out_of_bounds(HEIGHT, MARGIN):
-            lives -= 1
-            if lives > 0:
-                ball.reset_position(WIDTH // 2, HEIGHT - 50)
-            else:
-                game_state = "game_over"
-        # Check if only unbreakable tiles remain
-        if all(tile_type == 2 for _, tile_type in tiles):
-            level += 1  # Advance level
-            tiles = generate_tiles()
-            ball.reset_position(WIDTH // 2, HEIGHT - 50)
-        
-        paddle.draw(screen)
-        ball.draw(screen)
-        for tile, tile_type in tiles: ### handle false paddle deletion, draw game space border
-            pygame.draw.rect(screen, tile_types[tile_type]["color"], tile)
-        draw_score_and_lives(screen, font, score, lives, WIDTH, MARGIN)
-    elif game_state == "game_over":
-        # Prompt for name and save highscore
-        player_name = input("Enter your name: ")
-        save_highscore(player_name, score)
-        highscores = load_highscores()  # Reload highscores after saving
-        game_state = "main_menu"
-        score, lives = 0, 3  # Reset score and lives for new game
-
-    # Event handling for main menu and highscore screen
+    profiler.mark("input")
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
-        elif game_state == "main_menu" and event.type == pygame.MOUSEBUTTONDOWN:
-            if start_rect.collidepoint(event.pos):
-                game_state, tiles = "playing", generate_tiles()
-                paddle.reset_position(WIDTH // 2, HEIGHT - 50)
-                ball.reset_position(WIDTH // 2, HEIGHT - 50)
-                score, lives = 0, 3
-            elif highscore_rect.collidepoint(event.pos):
-                game_state = "highscore"
-        elif game_state == "highscore" and event.type == pygame.MOUSEBUTTONDOWN:
-            if back_rect.collidepoint(event.pos):
-                game_state = "main_menu"
-            elif reset_rect.collidepoint(event.pos):
-                reset_highscores()
-                highscores = load_highscores()  # Reload highscores after reset
-        elif game_state == "playing" and event.type == pygame.MOUSEBUTTONDOWN:
-            # Release the ball from magnetic paddle on click
-            if ball.attached_to_paddle:
-                paddle.release_magnetic()
-                ball.release_from_paddle()
-    pygame.display.flip()
-    clock.tick(60)
+        else:
+            scenes.handle_event(event)
+
+    profiler.mark("display_update")
+    if dirty_rects is None:
+        pygame.display.flip()
+    elif dirty_rects:
+        pygame.display.update(dirty_rects)  # Only push the parts of the screen that changed
+    profiler.end_frame()
+    if args.quit_after_first_frame:
+        print(time.time())
+        running = False
 
+scenes.close()  # Saves a recording of a game that was quit halfway
 # Restore cursor visibility on exit
 pygame.mouse.set_visible(True)
+highscore_worker.close()  # Let pending saves finish
+if leaderboard is not None:
+    leaderboard.close()  # Unsent scores stay in the outbox for the next run
+if args.profile_out:
+    profiler.export(args.profile_out)
 
 pygame.quit()
@@ -0,0 +1,151 @@
+import math
+
+import numpy as np
+import pygame
+
+from components import tile_types, BROKEN, EXPLODED, BURNED
+
+MAX_PARTICLE_RECTS = 64  # Past this many live particles draw() returns their bounding box instead of one rect each
+
+# Particles spawned per removed tile, by removal cause. speed is in pixels per tick, life in ticks and
+# gravity in pixels per tick squared. colors None means the color of the removed tile. When a tick asks for
+# more particles than the budget has left, emitters with a lower priority are dropped first.
+EMITTERS = {
+    EXPLODED: {"count": 10, "speed": 4.0, "life": 30, "gravity": 0.15, "priority": 2,
+               "colors": [(255, 220, 0), (255, 140, 0), (255, 60, 0)]},
+    BURNED: {"count": 6, "speed": 1.5, "life": 24, "gravity": -0.05, "priority": 1,  # Embers drift upwards
+             "colors": [(255, 100, 0), (200, 40, 0)]},
+    BROKEN: {"count": 4, "speed": 2.5, "life": 20, "gravity": 0.25, "priority": 0, "colors": None},
+}
+
+class ParticleSystem:
+    """Fixed pool of particles stored in arrays, spawned from a GameSession's "tiles_removed" events.
+
+    Register observe() with GameSession.add_observer and turn on GameSession.set_log_removals. Like
+    projectiles.ProjectilePool, spawning takes slots from a free list and dead particles give theirs back,
+    so nothing is allocated per particle. Every tick all particles move in one vectorized update, and
+    draw() blits them with a single Surface.blits call.
+
+    capacity is a hard budget. When the bursts of a tick need more particles than are free, emitters are
+    served by priority: the one that no longer fits is thinned out evenly over its tiles and the ones below
+    it are dropped, so a big chain explosion shows fewer sparks instead of stalling the frame.
+    """
+    def __init__(self, capacity=2048, size=3, emitters=EMITTERS, seed=None):
+        self.capacity = capacity
+        self.size = size
+        self.emitters = emitters
+        self.rng = np.random.default_rng(seed)  # Never the session's rng, so effects don't change a replay
+        self.x = np.zeros(capacity)  # Top-left corner of each particle, world coordinates
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.gravity = np.zeros(capacity)
+        self.life = np.zeros(capacity, dtype=np.int32)  # Ticks left
+        self.color = np.zeros(capacity, dtype=np.intp)  # Index into palette
+        self.alive = np.zeros(capacity, dtype=bool)
+        self._dead = np.zeros(capacity, dtype=bool)  # Scratch for update()
+        self._free = np.arange(capacity)[::-1].copy()  # Stack of free slots
+        self._free_count = capacity
+        self.dropped = 0  # Particles not spawned for lack of budget
+
+        # One palette for tile colors and emitter colors, its entries are pre-rendered sprites
+        self.palette = [properties["color"] for properties in tile_types.values()]
+        self._tile_colors = np.zeros(max(tile_types) + 1, dtype=np.intp)  # Tile type -> palette index
+        for index, tile_type in enumerate(tile_types):
+            self._tile_colors[tile_type] = index
+        self._emitter_colors = {}  # cause -> palette indices, for emitters with their own colors
+        for cause, emitter in emitters.items():
+            if emitter["colors"] is not None:
+                self._emitter_colors[cause] = np.arange(len(self.palette), len(self.palette) + len(emitter["colors"]))
+                self.palette.extend(emitter["colors"])
+        self._sprites = None  # Created on the first draw, once the display is up
+
+    @property
+    def count(self):
+        return self.capacity - self._free_count
+
+    def observe(self, session, events):
+        """GameSession observer: spawn bursts for the tiles removed in this step and advance every particle."""
+        bursts = [event[1:] for event in events if event[0] == "tiles_removed"]
+        if bursts:
+            self.emit(bursts)
+        self.update()
+
+    def emit(self, bursts):
+        """Spawn particles for (cause, x, y, types) batches of removed tiles, within the budget."""
+        by_cause = {}
+        for cause, x, y, types in bursts:
+            by_cause.setdefault(cause, []).append((x, y, types))
+        for cause in sorted(by_cause, key=lambda cause: -self.emitters[cause]["priority"]):
+            batches = by_cause[cause]
+            x, y, types = (np.concatenate(parts) for parts in zip(*batches))
+            count = self.emitters[cause]["count"]
+            fits = min(len(x), self._free_count // count)
+            self.dropped += (len(x) - fits) * count
+            if fits < len(x):  # Thin out evenly rather than keep only one end of the blast
+                keep = np.linspace(0, len(x) - 1, fits).round().astype(np.intp)
+                x, y, types = x[keep], y[keep], types[keep]
+            if fits:
+                self._spawn(cause, x, y, types)
+
+    def _spawn(self, cause, x, y, types):
+        emitter, rng = self.emitters[cause], self.rng
+        count = emitter["count"]
+        total = len(x) * count
+        self._free_count -= total
+        slots = self._free[self._free_count:self._free_count + total]
+        angle = rng.uniform(0, 2 * math.pi, total)
+        speed = rng.uniform(0.3, 1.0, total) * emitter["speed"]
+        self.x[slots] = np.repeat(x, count) - self.size / 2
+        self.y[slots] = np.repeat(y, count) - self.size / 2
+        self.vx[slots] = np.cos(angle) * speed
+        self.vy[slots] = np.sin(angle) * speed
+        self.gravity[slots] = emitter["gravity"]
+        self.life[slots] = rng.integers(emitter["life"] // 2, emitter["life"] + 1, total)
+        colors = self._emitter_colors.get(cause)
+        self.color[slots] = self._tile_colors[np.repeat(types, count)] if colors is None else rng.choice(colors, total)
+        self.alive[slots] = True
+
+    def _release(self, indices):
+        self.alive[indices] = False
+        self._free[self._free_count:self._free_count + len(indices)] = indices
+        self._free_count += len(indices)
+
+    def update(self):
+        """Advance every live particle by one tick and free the ones that burned out."""
+        if self._free_count == self.capacity:
+            return
+        alive = self.alive
+        np.add(self.vy, self.gravity, out=self.vy, where=alive)
+        np.add(self.x, self.vx, out=self.x, where=alive)
+        np.add(self.y, self.vy, out=self.y, where=alive)
+        np.subtract(self.life, 1, out=self.life, where=alive)
+        dead = np.less_equal(self.life, 0, out=self._dead)
+        dead &= alive
+        if np.count_nonzero(dead):
+            self._release(np.nonzero(dead)[0])
+
+    def clear(self):
+        self._release(np.nonzero(self.alive)[0])
+
+    def draw(self, surface, camera_y=0):
+        """Draw every live particle and return the rects that changed. camera_y is the world y at the top of surface."""
+        if self._free_count == self.capacity:
+            return []
+        if self._sprites is None:
+            self._sprites = []
+            for color in self.palette:
+                sprite = pygame.Surface((self.size, self.size)).convert()
+                sprite.fill(color)
+                self._sprites.append(sprite)
+        live = np.nonzero(self.alive)[0]
+        xs, ys = self.x[live].astype(np.intp), (self.y[live] - camera_y).astype(np.intp)
+        sprites = self._sprites
+        many = len(live) > MAX_PARTICLE_RECTS
+        rects = surface.blits([(sprites[color], (x, y)) for color, x, y in zip(self.color[live].tolist(), xs.tolist(), ys.tolist())],
+                              doreturn=not many)
+        if many:  # Sparks fly past the area being drawn, keep the box within the surface's clip
+            left, top = int(xs.min()), int(ys.min())
+            box = pygame.Rect(left, top, int(xs.max()) - left + self.size, int(ys.max()) - top + self.size)
+            return [box.clip(surface.get_clip())]
+        return rects
@@ -0,0 +1,102 @@
+import csv
+import json
+import time
+from collections import deque
+
+import pygame
+
+from screens import text_cache
+
+class PhaseProfiler:
+    """Times the consecutive phases of each frame with perf_counter_ns.
+
+    mark(name) ends the running phase and starts the next one, so instrumenting a loop is one call per
+    phase. A phase marked several times in a frame, like the engine phases with several ticks per frame,
+    is added up, so the rolling p50/p99 kept over the last window frames are per frame, and a phase that
+    didn't run in a frame counts 0 for it. The last max_events phase timings, one per mark, can be exported
+    as CSV or Chrome trace-event JSON (chrome://tracing, Perfetto).
+    A disabled profiler returns from every call right away.
+    """
+    def __init__(self, enabled=True, window=240, max_events=100_000):
+        self.enabled = enabled
+        self.window = window
+        self.samples = {}  # phase -> deque of durations in ns
+        self.events = deque(maxlen=max_events)  # (frame, phase, start ns, duration ns)
+        self._totals = {}  # phase -> ns spent in it so far this frame
+        self.frame = 0
+        self._phase = None
+        self._start = 0
+        self._origin = time.perf_counter_ns()
+        self._lines = []
+
+    def begin_frame(self):
+        if self.enabled:
+            self.frame += 1
+            self._phase = None
+            self._totals.clear()
+
+    def mark(self, phase):
+        """End the current phase and start timing phase."""
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        if self._phase is not None:
+            self._record(self._phase, self._start, now)
+        self._phase, self._start = phase, now
+
+    def end_frame(self):
+        if not self.enabled or self._phase is None:
+            return
+        self._record(self._phase, self._start, time.perf_counter_ns())
+        self._phase = None
+        totals = self._totals
+        for phase, samples in self.samples.items():
+            samples.append(totals.pop(phase, 0))
+        for phase, total in totals.items():  # First frame with these phases
+            self.samples[phase] = deque([total], maxlen=self.window)
+        totals.clear()
+
+    def _record(self, phase, start, end):
+        self._totals[phase] = self._totals.get(phase, 0) + end - start
+        self.events.append((self.frame, phase, start - self._origin, end - start))
+
+    def percentiles(self):
+        """{phase: (p50 ms, p99 ms)} over the rolling window."""
+        result = {}
+        for phase, samples in self.samples.items():
+            ordered = sorted(samples)
+            result[phase] = (ordered[len(ordered) // 2] / 1e6, ordered[min(len(ordered) - 1, len(ordered) * 99 // 100)] / 1e6)
+        return result
+
+    def overlay_lines(self, refresh=30):
+        """Text rows for the overlay, recomputed every refresh frames so the numbers stay readable."""
+        if not self._lines or self.frame % refresh == 0:
+            self._lines = [f"{'phase ms':15s}{'p50':>6s}{'p99':>7s}"]
+            self._lines += [f"{phase:15s}{p50:6.2f}{p99:7.2f}" for phase, (p50, p99) in self.percentiles().items()]
+        return self._lines
+
+    def export(self, path):
+        """Write the recorded phases as Chrome trace JSON for .json paths, CSV otherwise."""
+        if path.endswith(".json"):
+            events = [{"name": phase, "cat": "frame", "ph": "X", "ts": start / 1000, "dur": duration / 1000,
+                       "pid": 0, "tid": 0, "args": {"frame": frame}}
+                      for frame, phase, start, duration in self.events]
+            with open(path, "w") as file:
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+        else:
+            with open(path, "w", newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow(["frame", "phase", "start_us", "duration_us"])
+                for frame, phase, start, duration in self.events:
+                    writer.writerow([frame, phase, start / 1000, duration / 1000])
+
+
+def draw_profiler_overlay(screen, font, profiler, position=(530, 220)):
+    """Draw a table of rolling p50/p99 per phase and return its rect for the dirty-rect list."""
+    lines = profiler.overlay_lines()
+    line_height = font.get_linesize()
+    rect = pygame.Rect(position, (260, line_height * len(lines) + 4))
+    screen.fill((30, 30, 30), rect)
+    for i, line in enumerate(lines):
+        screen.blit(text_cache.render(font, line, (0, 255, 0)), (rect.x + 4, rect.y + 2 + i * line_height))
+    return rect
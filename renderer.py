@@ -0,0 +1,195 @@
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+from components import tile_types, EMPTY, CHUNK_ROWS, CHUNK_COLS
+from screens import draw_score_and_lives
+
+MAX_DIRTY_RECTS = 200  # Past this many rects a single full-screen update is cheaper
+MAX_CHUNK_SURFACES = 32  # Rendered board chunks kept around, the least recently shown ones are dropped first
+CAMERA_FOCUS = 2 / 3  # The camera keeps the lowest ball this far down the screen
+
+class SessionRenderer:
+    """Draws a GameSession with a cached tile layer and returns only the screen areas that changed.
+
+    The board is pre-rendered chunk by chunk (components.CHUNK_ROWS x CHUNK_COLS cells) onto off-screen
+    surfaces, and the chunks in view are composed onto a screen-sized layer. Each frame, cells in view whose
+    tile type changed are redrawn on their chunk and on the layer, the previous paddle and ball positions are
+    restored from the layer, and the HUD is only redrawn when score or lives change. Pass the returned rects
+    to pygame.display.update.
+
+    When the world is taller than the screen, the camera follows the lowest ball. Only the chunks in view are
+    rendered and compared, so a frame costs about the same on a 5-row and on a 500-row board.
+    """
+    def __init__(self, screen, font, session):
+        self.screen = screen
+        self.font = font
+        self.session = session
+        self.layer = pygame.Surface(screen.get_size()).convert()
+        self.hud_rect = pygame.Rect(0, 0, session.width, session.margin + session.score_padding)
+        self.play_rect = pygame.Rect(0, self.hud_rect.bottom, screen.get_width(), screen.get_height() - self.hud_rect.bottom)
+        self.camera_y = 0  # World y at the top of the screen
+        self._tiles = None  # TileGrid the chunks were rendered from
+        self._types = None  # Copy of its type array as drawn on the chunks
+        self._changed = None  # Scratch mask for comparing the two
+        self._chunks = OrderedDict()  # (chunk row, chunk column) -> Surface
+        self._composed = None  # (tiles, left, top, camera_y) the layer was composed for
+        self._hud = None  # (score, lives) shown on screen
+        self._sprite_rects = []  # Paddle and ball rects drawn last frame
+        self._full = True
+        self.profiler = None  # Optional profiler.PhaseProfiler
+        self.particles = None  # Optional particles.ParticleSystem, drawn over the balls
+
+    def invalidate(self):
+        """Redraw everything on the next frame, e.g. after another screen was shown."""
+        self._full = True
+
+    def _follow(self, alpha):
+        """Camera position for this frame, within the world."""
+        session = self.session
+        overflow = session.height - self.screen.get_height()
+        if overflow <= 0:
+            return 0
+        balls = session.balls
+        n = balls.count
+        if n:
+            y = float((balls.prev_y[:n] + (balls.y[:n] - balls.prev_y[:n]) * alpha).max())
+        else:
+            y = session.paddle.rect.y
+        return min(max(int(y - self.screen.get_height() * CAMERA_FOCUS), 0), overflow)
+
+    def _visible_rows(self, tiles):
+        """First and past-the-last board row inside the play area."""
+        top = self.camera_y + self.play_rect.top - tiles.top
+        bottom = self.camera_y + self.play_rect.bottom - tiles.top
+        return max(top // tiles.tile_height, 0), min(-(-bottom // tiles.tile_height), tiles.rows)
+
+    def _cell_rect(self, tiles, row, col):
+        return pygame.Rect(tiles.left + col * tiles.tile_width, tiles.top + row * tiles.tile_height - self.camera_y,
+                           tiles.tile_width, tiles.tile_height)
+
+    def _chunk_surface(self, tiles, chunk):
+        surface = self._chunks.get(chunk)
+        if surface is not None:
+            self._chunks.move_to_end(chunk)
+            return surface
+        rows, cols = tiles.chunk_slice(chunk)
+        width, height = tiles.tile_width, tiles.tile_height
+        surface = pygame.Surface(((cols.stop - cols.start) * width, (rows.stop - rows.start) * height)).convert()
+        surface.fill((0, 0, 0))
+        types = tiles.types[rows, cols]
+        if tiles.chunk_counts[chunk]:
+            for row, col in zip(*np.nonzero(types != EMPTY)):
+                pygame.draw.rect(surface, tile_types[int(types[row, col])]["color"], (col * width, row * height, width, height))
+        self._types[rows, cols] = types
+        self._chunks[chunk] = surface
+        if len(self._chunks) > MAX_CHUNK_SURFACES:
+            self._chunks.popitem(last=False)
+        return surface
+
+    def _compose(self, tiles):
+        """Draw the chunks in view onto the layer."""
+        self.layer.fill((0, 0, 0))
+        self.layer.set_clip(self.play_rect)
+        first, last = self._visible_rows(tiles)
+        if first < last:
+            for chunk_row in range(first // CHUNK_ROWS, (last - 1) // CHUNK_ROWS + 1):
+                for chunk_col in range(tiles.chunk_counts.shape[1]):
+                    self.layer.blit(self._chunk_surface(tiles, (chunk_row, chunk_col)),
+                                    (tiles.left + chunk_col * CHUNK_COLS * tiles.tile_width,
+                                     tiles.top + chunk_row * CHUNK_ROWS * tiles.tile_height - self.camera_y))
+        self.layer.set_clip(None)
+        self._composed = (tiles, tiles.left, tiles.top, self.camera_y)
+
+    def _draw_cell(self, tiles, row, col, tile_type):
+        """Redraw one cell on its chunk and on the layer and return its rect on screen."""
+        color = (0, 0, 0) if tile_type == EMPTY else tile_types[tile_type]["color"]
+        chunk = self._chunks.get((row // CHUNK_ROWS, col // CHUNK_COLS))
+        if chunk is not None:  # Chunks without a surface are drawn from the current tiles once they get one
+            self._types[row, col] = tile_type
+            width, height = tiles.tile_width, tiles.tile_height
+            chunk.fill(color, ((col % CHUNK_COLS) * width, (row % CHUNK_ROWS) * height, width, height))
+        rect = self._cell_rect(tiles, row, col).clip(self.play_rect)
+        self.layer.fill(color, rect)
+        return rect
+
+    def _update_layer(self, tiles):
+        """Bring the layer up to date with the tiles in view and return the rects of the cells redrawn."""
+        if tiles is not self._tiles or tiles.types.shape != self._types.shape:
+            self._tiles = tiles
+            self._types = tiles.types.copy()
+            self._changed = np.zeros(tiles.types.shape, dtype=bool)
+            self._chunks.clear()
+        # Cells that changed while out of view are caught here once they scroll in
+        rects = []
+        first, last = self._visible_rows(tiles)
+        if first < last:
+            changed = np.not_equal(tiles.types[first:last], self._types[first:last], out=self._changed[first:last])
+            if np.count_nonzero(changed):
+                rows, cols = np.nonzero(changed)
+                rows += first
+                rects = [self._draw_cell(tiles, row, col, tile_type)
+                         for row, col, tile_type in zip(rows.tolist(), cols.tolist(), tiles.types[rows, cols].tolist())]
+        if self._composed != (tiles, tiles.left, tiles.top, self.camera_y):
+            # New level, scrolled board or moved camera: the chunks are reused, only their placement changed
+            self._compose(tiles)
+            self._full = True
+            return []
+        return rects
+
+    def _draw_sprites(self, alpha):
+        session, screen, camera_y = self.session, self.screen, self.camera_y
+        paddle = session.paddle
+        x = round(session.prev_paddle_x + (paddle.rect.x - session.prev_paddle_x) * alpha)
+        screen.set_clip(self.play_rect)
+        rects = [pygame.draw.rect(screen, paddle.color, (x, paddle.rect.y - camera_y, paddle.rect.width, paddle.rect.height))]
+        rects.extend(session.balls.draw(screen, alpha, camera_y))
+        rects.extend(session.projectiles.draw(screen, camera_y))
+        if self.particles is not None:
+            rects.extend(self.particles.draw(screen, camera_y))
+        screen.set_clip(None)
+        # The clip only limits the drawing, Surface.fill and friends still return the unclipped rect. Outside
+        # play_rect it would be restored from the HUD band of the layer next frame and erase the score.
+        play_rect = self.play_rect
+        return [rect.clip(play_rect) for rect in rects]
+
+    def _draw_hud(self):
+        session = self.session
+        self.screen.blit(self.layer, self.hud_rect, self.hud_rect)
+        draw_score_and_lives(self.screen, self.font, session.score, session.lives, session.width, session.margin)
+        self._hud = (session.score, session.lives)
+
+    def draw(self, alpha=1.0):
+        """Draw the current frame and return the list of dirty screen rects.
+
+        Paddle and balls are drawn alpha of the way from the previous to the current simulation step.
+        """
+        session, screen, profiler = self.session, self.screen, self.profiler
+        if profiler:
+            profiler.mark("tile_draw")
+        self.camera_y = self._follow(alpha)
+        cell_rects = self._update_layer(session.tiles)
+
+        if self._full:
+            screen.blit(self.layer, (0, 0))
+            self._draw_hud()
+            self._sprite_rects = self._draw_sprites(alpha)
+            self._full = False
+            return [screen.get_rect()]
+
+        dirty = cell_rects + self._sprite_rects
+        for rect in dirty:
+            screen.blit(self.layer, rect, rect)  # Restore tiles and erase last frame's sprites
+        if profiler:
+            profiler.mark("hud")
+        if self._hud != (session.score, session.lives):
+            self._draw_hud()
+            dirty.append(self.hud_rect)
+        if profiler:
+            profiler.mark("sprite_draw")
+        self._sprite_rects = self._draw_sprites(alpha)
+        dirty.extend(self._sprite_rects)
+        if len(dirty) > MAX_DIRTY_RECTS:
+            return [screen.get_rect()]
+        return dirty
@@ -0,0 +1,141 @@
+"""Record the per-tick inputs of a game and replay them headless.
+
+A recording is the session's seed and settings, two bytes per tick of input and a summary of the final
+state. Replaying one runs the engine at full CPU speed without a display, so recordings double as
+regression tests (verify) and reproducible performance workloads (bench).
+
+    python replay.py play game.rec
+    python replay.py verify recordings/*.rec
+    python replay.py bench game.rec
+    python replay.py verify --levels campaign.slp game.rec  # a game played from a level pack
+"""
+import argparse
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+from engine import GameSession, Inputs
+
+MAGIC = b"SBRP"
+VERSION = 3  # 2: levels are generated from per-level seeds, 3: board rows in the header
+HEADER = struct.Struct("<4sBQHHHHBH")  # magic, version, seed, width, height, margin, score_padding, lives, rows
+HEADER_V2 = struct.Struct("<4sBQHHHHB")  # Version 2 header, its games have 5 rows
+SUMMARY = struct.Struct("<IIHHI")  # ticks, score, level, lives, crc32 of the tile types
+CLICK_BIT = 0x8000  # Each tick is one uint16: paddle x in the low 15 bits, click in the top bit
+
+def summarize(session):
+    """The final-state fields stored in a recording and compared by verify."""
+    return (session.ticks, session.score, session.level, session.lives, zlib.crc32(session.tiles.types.tobytes()))
+
+class Recorder:
+    """Collects the inputs of every tick of one seeded game."""
+    def __init__(self, session):
+        if session.seed is None:
+            raise ValueError("Only seeded sessions can be recorded")
+        self.session = session
+        self.header = HEADER.pack(MAGIC, VERSION, session.seed, session.width, session.height, session.margin,
+                                  session.score_padding, session.start_lives, session.rows)
+        self.ticks = array("H")
+
+    def record(self, inputs):
+        self.ticks.append(max(0, min(int(inputs.mouse_x), CLICK_BIT - 1)) | (CLICK_BIT if inputs.clicked else 0))
+
+    def step(self, inputs):
+        """Record inputs and advance the session with them."""
+        self.record(inputs)
+        return self.session.step(inputs)
+
+    def save(self, path):
+        ticks = array("H", self.ticks)
+        if sys.byteorder != "little":
+            ticks.byteswap()
+        with open(path, "wb") as file:
+            file.write(self.header)
+            file.write(struct.pack("<I", len(ticks)))
+            file.write(ticks.tobytes())
+            file.write(SUMMARY.pack(*summarize(self.session)))
+
+class Replay:
+    """A loaded recording."""
+    def __init__(self, settings, ticks, summary):
+        self.seed, self.width, self.height, self.margin, self.score_padding, self.lives, self.rows = settings
+        self.ticks = ticks
+        self.summary = summary
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            data = file.read()
+        magic, version = data[:4], data[4]
+        if magic != MAGIC or version not in (2, VERSION):
+            raise ValueError(f"{path} is not a version 2 or {VERSION} recording")
+        header = HEADER if version == VERSION else HEADER_V2
+        _, _, *settings = header.unpack_from(data)
+        if version == 2:
+            settings.append(5)
+        (count,) = struct.unpack_from("<I", data, header.size)
+        start = header.size + 4
+        ticks = array("H")
+        ticks.frombytes(data[start:start + 2 * count])
+        if sys.byteorder != "little":
+            ticks.byteswap()
+        return cls(settings, ticks, SUMMARY.unpack_from(data, start + 2 * count))
+
+    def inputs(self):
+        for value in self.ticks:
+            yield Inputs(value & (CLICK_BIT - 1), bool(value & CLICK_BIT))
+
+    def play(self, level_pack=None):
+        """Fast-forward the recorded game and return the finished session, already closed.
+
+        The recording doesn't hold the levels of a game played from a level pack, pass the same pack.
+        """
+        # Levels are built inline, a fast-forward has no frame time for a worker thread to hide them in
+        session = GameSession(self.width, self.height, self.margin, self.score_padding, self.lives, seed=self.seed,
+                              rows=self.rows, level_pack=level_pack, prefetch_levels=False)
+        try:
+            session.start(self.seed)
+            step = session.step
+            for inputs in self.inputs():
+                step(inputs)
+        finally:
+            session.close()
+        return session
+
+    def verify(self, level_pack=None):
+        """True when replaying ends in exactly the recorded final state."""
+        return summarize(self.play(level_pack)) == self.summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded games headless.")
+    parser.add_argument("command", choices=["play", "verify", "bench"])
+    parser.add_argument("recordings", nargs="+")
+    parser.add_argument("--levels", metavar="PACK", help="level pack the games were played with")
+    args = parser.parse_args(argv)
+
+    level_pack = None
+    if args.levels:
+        from levelpack import LevelPack
+        level_pack = LevelPack(args.levels)
+
+    failed = 0
+    for path in args.recordings:
+        replay = Replay.load(path)
+        if args.command == "play":
+            ticks, score, level, lives, _ = summarize(replay.play(level_pack))
+            print(f"{path}: {ticks} ticks, score {score}, level {level}, lives {lives}")
+        elif args.command == "verify":
+            ok = replay.verify(level_pack)
+            failed += not ok
+            print(f"{path}: {'OK' if ok else 'MISMATCH'}")
+        else:
+            start = time.perf_counter()
+            replay.play(level_pack)
+            elapsed = time.perf_counter() - start
+            print(f"{path}: {len(replay.ticks)} ticks in {elapsed:.3f} s ({len(replay.ticks) / elapsed:.0f} ticks/s)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
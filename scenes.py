@@ -0,0 +1,271 @@
+import random
+
+import pygame
+
+from screens import draw_main_menu, draw_highscore_screen, draw_name_entry, draw_reset_confirmation, get_font
+from profiler import draw_profiler_overlay
+
+class Scene:
+    """One screen of the game. SceneManager calls enter/exit on switches, draw and handle_event every frame."""
+    mouse_visible = True
+
+    def __init__(self, manager):
+        self.manager = manager
+
+    def enter(self):
+        pass
+
+    def exit(self):
+        pass
+
+    def close(self):
+        """Release resources when the game quits."""
+
+    def handle_event(self, event):
+        pass
+
+    def draw(self, frame_time):
+        """Draw a frame and return the dirty rects, an empty list if nothing changed or None for a full flip."""
+        return []
+
+
+class StaticScene(Scene):
+    """Scene whose picture only depends on its data, rendered once into a cached surface.
+
+    Subclasses implement render(surface) and keep the clickable rects it returns in self.buttons. While
+    nothing changes, draw() returns no dirty rects at all; call invalidate() when the data changed.
+    """
+    def __init__(self, manager):
+        super().__init__(manager)
+        self.surface = None
+        self.buttons = None
+        self._shown = False  # Cached surface is on screen
+
+    def invalidate(self):
+        self.surface = None
+
+    def enter(self):
+        self._shown = False
+
+    def render(self, surface):
+        raise NotImplementedError
+
+    def draw(self, frame_time):
+        if self.surface is None:
+            self.surface = pygame.Surface(self.manager.screen.get_size()).convert()
+            self.buttons = self.render(self.surface)
+            self._shown = False
+        if self._shown:
+            return []
+        self.manager.screen.blit(self.surface, (0, 0))
+        self._shown = True
+        return None
+
+
+class MainMenuScene(StaticScene):
+    def render(self, surface):
+        return draw_main_menu(surface, get_font())
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            start_rect, highscore_rect = self.buttons
+            if start_rect.collidepoint(event.pos):
+                self.manager.switch("playing")
+            elif highscore_rect.collidepoint(event.pos):
+                self.manager.switch("highscore")
+
+
+class HighscoreScene(StaticScene):
+    def __init__(self, manager):
+        super().__init__(manager)
+        self.highscores = []
+
+    def set_highscores(self, highscores):
+        """Show a freshly loaded highscore list, re-rendering the screen."""
+        self.highscores = highscores
+        self.invalidate()
+
+    def render(self, surface):
+        return draw_highscore_screen(surface, get_font(), self.highscores)
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            reset_rect, back_rect = self.buttons
+            if back_rect.collidepoint(event.pos):
+                self.manager.switch("main_menu")
+            elif reset_rect.collidepoint(event.pos):
+                self.manager.switch("confirm_reset")
+
+
+class ConfirmResetScene(StaticScene):
+    def __init__(self, manager, highscore_worker):
+        super().__init__(manager)
+        self.highscore_worker = highscore_worker
+
+    def render(self, surface):
+        return draw_reset_confirmation(surface, get_font())
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            yes_rect, no_rect = self.buttons
+            if yes_rect.collidepoint(event.pos):
+                self.highscore_worker.reset()
+                self.manager.switch("highscore")
+            elif no_rect.collidepoint(event.pos):
+                self.manager.switch("highscore")
+
+
+class NameEntryScene(StaticScene):
+    """Prompt for the player's name after a game, the highscore is saved once it is confirmed."""
+    def __init__(self, manager, highscore_worker, playing):
+        super().__init__(manager)
+        self.highscore_worker = highscore_worker
+        self.playing = playing
+        self.name = ""
+
+    def enter(self):
+        super().enter()
+        self.name = ""
+        self.invalidate()
+
+    def render(self, surface):
+        return draw_name_entry(surface, get_font(), self.name, self.playing.session.score)
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_BACKSPACE:
+            self.name = self.name[:-1]
+            self.invalidate()
+        elif event.type == pygame.KEYDOWN and event.key != pygame.K_RETURN:
+            if event.unicode.isprintable() and len(self.name) < 16:
+                self.name += event.unicode
+                self.invalidate()
+        elif event.type == pygame.KEYDOWN or (event.type == pygame.MOUSEBUTTONDOWN and self.buttons.collidepoint(event.pos)):
+            self.highscore_worker.save(self.name, self.playing.session.score)
+            self.manager.switch("main_menu")
+
+
+class PlayingScene(Scene):
+    """A running game: fixed-timestep simulation and dirty-rect rendering.
+
+    The engine and renderer import NumPy-backed modules, they are loaded when the first game starts.
+    """
+    mouse_visible = False
+
+    def __init__(self, manager, width, height, margin, score_padding, profiler, show_profiler=False, record=None, rows=5,
+                 levels=None):
+        super().__init__(manager)
+        self.size = (width, height, margin, score_padding)
+        self.rows = rows  # Tile rows per level, boards taller than the screen scroll
+        self.levels = levels  # Path of a level pack to play instead of random levels
+        self.level_pack = None
+        self.profiler = profiler
+        self.show_profiler = show_profiler
+        self.record = record  # Path the inputs of each game are recorded to
+        self.session = self.renderer = self.timestep = self.recorder = self.particles = None
+        self._inputs = self._recorder_type = None  # engine.Inputs and replay.Recorder, once loaded
+        self.clicked = False
+
+    def _load(self):
+        from engine import GameSession, Inputs, FixedTimestep, world_height
+        from renderer import SessionRenderer
+        from replay import Recorder
+        from particles import ParticleSystem
+        self._inputs, self._recorder_type = Inputs, Recorder
+        width, height, margin, score_padding = self.size
+        rows = self.rows
+        if self.levels:
+            from levelpack import LevelPack
+            self.level_pack = LevelPack(self.levels)
+            rows = max(rows, self.level_pack.max_rows)  # Room for the tallest level of the pack
+        self.session = GameSession(width, world_height(rows, margin, score_padding, height), margin, score_padding,
+                                   rows=rows, level_pack=self.level_pack)
+        self.renderer = SessionRenderer(self.manager.screen, get_font(), self.session)
+        self.timestep = FixedTimestep()
+        self.particles = self.renderer.particles = ParticleSystem()
+        self.session.add_observer(self.particles.observe)
+        self.session.set_log_removals(True)
+        if self.profiler.enabled:
+            self.session.set_profiler(self.profiler)
+            self.renderer.profiler = self.profiler
+
+    def enter(self):
+        if self.session is None:
+            self._load()
+        self.session.start(seed=random.getrandbits(32))  # Seeded so the game can be replayed
+        self.recorder = self._recorder_type(self.session) if self.record else None
+        self.particles.clear()
+        self.renderer.invalidate()
+        self.timestep.reset()
+        self.clicked = False
+
+    def exit(self):
+        if self.recorder:
+            self.recorder.save(self.record)  # Also keeps a game that was quit halfway
+            self.recorder = None
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+        if self.level_pack is not None:
+            self.level_pack.close()
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            self.clicked = True  # Releases the ball from the magnetic paddle
+
+    def draw(self, frame_time):
+        session = self.session
+        mouse_x = pygame.mouse.get_pos()[0]
+        self.profiler.mark("timestep")  # Ends housekeeping here also in frames without a tick
+        for _ in range(self.timestep.advance(frame_time)):
+            (self.recorder or session).step(self._inputs(mouse_x, self.clicked))
+            self.clicked = False
+            if session.game_over:
+                break
+        dirty_rects = self.renderer.draw(self.timestep.alpha)
+        if self.show_profiler:
+            dirty_rects.append(draw_profiler_overlay(self.manager.screen, get_font(20), self.profiler))
+        if session.game_over:
+            self.manager.switch("game_over")
+        return dirty_rects
+
+
+class SceneManager:
+    """Holds the scenes by name and forwards the frame loop to the current one.
+
+    Switching calls exit() on the old scene and enter() on the new one, and sets the mouse visibility only
+    then, not every frame.
+    """
+    def __init__(self, screen):
+        self.screen = screen
+        self.scenes = {}
+        self.current = None
+
+    def add(self, name, scene):
+        self.scenes[name] = scene
+        return scene
+
+    def switch(self, name):
+        if self.current is not None:
+            self.current.exit()
+        self.current = self.scenes[name]
+        pygame.mouse.set_visible(self.current.mouse_visible)
+        self.current.enter()
+
+    def handle_event(self, event):
+        self.current.handle_event(event)
+
+    def draw(self, frame_time):
+        """Draw the current scene, see Scene.draw for the return value."""
+        scene = self.current
+        dirty_rects = scene.draw(frame_time)
+        if self.current is not scene:  # It switched away while drawing, show the new scene right away
+            self.current.draw(0.0)
+            return None
+        return dirty_rects
+
+    def close(self):
+        if self.current is not None:
+            self.current.exit()
+        for scene in self.scenes.values():
+            scene.close()
@@ -0,0 +1,75 @@
+import heapq
+
+# Timed entries of components.modifiers: the multiplier channel they act on, their factor and duration in seconds
+TIMED_MODIFIERS = {
+    "2x_score": ("score", 2.0, 20),
+    "slow_ball": ("ball_speed", 0.75, 15),
+    "fast_ball": ("ball_speed", 1.25, 15),
+    "shrink_paddle": ("paddle_width", 0.75, 20),
+    "grow_paddle": ("paddle_width", 1.25, 20),
+}
+
+# Stacked effects are clamped to these combined multipliers (min_speed/max_speed, min_size/max_size)
+CHANNEL_LIMITS = {
+    "score": (1.0, 8.0),
+    "ball_speed": (0.5, 3.0),
+    "paddle_width": (0.5, 2.0),
+}
+
+class EffectScheduler:
+    """Applies timed modifiers and expires them through a heap keyed on simulation tick.
+
+    Each tick, advance() only looks at the earliest expiry, so active effects cost nothing until one runs
+    out. The combined multiplier of each channel is recomputed when an effect starts or ends; reading it
+    with multiplier() is a dict lookup.
+    """
+    def __init__(self, tick_rate=60, modifiers=TIMED_MODIFIERS, limits=CHANNEL_LIMITS):
+        self.tick_rate = tick_rate
+        self.modifiers = modifiers
+        self.limits = limits
+        self.multipliers = {channel: 1.0 for channel in limits}
+        self.active = {}  # effect id -> (name, channel, factor)
+        self._heap = []  # (expiry tick, effect id)
+        self._next_id = 0
+
+    def apply(self, name, now, duration=None):
+        """Start modifier name at tick now, for its default duration unless duration (seconds) is given."""
+        channel, factor, default_duration = self.modifiers[name]
+        effect_id = self._next_id
+        self._next_id += 1
+        self.active[effect_id] = (name, channel, factor)
+        expires = now + round((default_duration if duration is None else duration) * self.tick_rate)
+        heapq.heappush(self._heap, (expires, effect_id))
+        self._recompute(channel)
+        return effect_id
+
+    def advance(self, now):
+        """Expire every effect due by tick now and return their names."""
+        expired = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, effect_id = heapq.heappop(heap)
+            name, channel, _ = self.active.pop(effect_id)
+            self._recompute(channel)
+            expired.append(name)
+        return expired
+
+    def multiplier(self, channel):
+        return self.multipliers[channel]
+
+    def remaining(self, now):
+        """(name, ticks left) of the active effects, soonest first, e.g. for a HUD countdown."""
+        return [(self.active[effect_id][0], expires - now) for expires, effect_id in sorted(self._heap)]
+
+    def clear(self):
+        self.active.clear()
+        self._heap.clear()
+        self.multipliers = {channel: 1.0 for channel in self.limits}
+
+    def _recompute(self, channel):
+        combined = 1.0
+        for _, effect_channel, factor in self.active.values():
+            if effect_channel == channel:
+                combined *= factor
+        low, high = self.limits[channel]
+        self.multipliers[channel] = min(max(combined, low), high)
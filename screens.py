@@ -1,17 +1,61 @@
 import pygame
+from collections import OrderedDict
+
+
+class TextCache:
+    """Bounded LRU cache of rendered text surfaces keyed by (font, text, color, antialias)."""
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, color, antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)  # Drop the least recently used text
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+        self.hits = self.misses = 0
+
+
+# Shared by all screens so static labels are only rasterized once
+text_cache = TextCache()
+
+_fonts = {}
+
+def get_font(size=36):
+    """The default font at size, loaded on first use and shared afterwards."""
+    font = _fonts.get(size)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = _fonts[size] = pygame.font.Font(None, size)
+    return font
+
 
 def draw_main_menu(screen, font):
     screen.fill((0, 0, 0))
-    title_text = font.render("Tile Breaker Game", True, (255, 255, 255))
+    title_text = text_cache.render(font, "Tile Breaker Game", (255, 255, 255))
     title_rect = title_text.get_rect(center=(screen.get_width() // 2, screen.get_height() // 4))
     screen.blit(title_text, title_rect)
 
-    start_text = font.render("Start", True, (255, 255, 255))
+    start_text = text_cache.render(font, "Start", (255, 255, 255))
     start_rect = start_text.get_rect(center=(screen.get_width() // 2, screen.get_height() // 2))
     pygame.draw.rect(screen, (100, 100, 100), start_rect.inflate(20, 10))
     screen.blit(start_text, start_rect)
 
-    highscore_text = font.render("Highscore", True, (255, 255, 255))
+    highscore_text = text_cache.render(font, "Highscore", (255, 255, 255))
     highscore_rect = highscore_text.get_rect(center=(screen.get_width() // 2, screen.get_height() // 2 + 50))
     pygame.draw.rect(screen, (100, 100, 100), highscore_rect.inflate(20, 10))
     screen.blit(highscore_text, highscore_rect)
@@ -21,20 +65,20 @@ def draw_main_menu(screen, font):
 
 def draw_highscore_screen(screen, font, highscores):
     screen.fill((0, 0, 0))
-    title_text = font.render("Highscores", True, (255, 255, 255))
+    title_text = text_cache.render(font, "Highscores", (255, 255, 255))
     title_rect = title_text.get_rect(center=(screen.get_width() // 2, screen.get_height() // 8))
     screen.blit(title_text, title_rect)
 
     for i, entry in enumerate(highscores[:10]):
-        score_text = font.render(f"{i + 1}. {entry['name']} - {entry['score']}", True, (255, 255, 255))
+        score_text = text_cache.render(font, f"{i + 1}. {entry['name']} - {entry['score']}", (255, 255, 255))
         screen.blit(score_text, (screen.get_width() // 2 - 100, screen.get_height() // 8 + 50 + i * 30))
 
-    reset_text = font.render("Reset", True, (255, 255, 255))
+    reset_text = text_cache.render(font, "Reset", (255, 255, 255))
     reset_rect = reset_text.get_rect(center=(screen.get_width() // 2 - 100, screen.get_height() - 50))
     pygame.draw.rect(screen, (100, 100, 100), reset_rect.inflate(20, 10))
     screen.blit(reset_text, reset_rect)
 
-    back_text = font.render("Back", True, (255, 255, 255))
+    back_text = text_cache.render(font, "Back", (255, 255, 255))
     back_rect = back_text.get_rect(center=(screen.get_width() // 2 + 100, screen.get_height() - 50))
     pygame.draw.rect(screen, (100, 100, 100), back_rect.inflate(20, 10))
     screen.blit(back_text, back_rect)
@@ -42,11 +86,77 @@ def draw_highscore_screen(screen, font, highscores):
     return reset_rect, back_rect
 
 
+def draw_name_entry(screen, font, name, score):
+    screen.fill((0, 0, 0))
+    title_text = text_cache.render(font, "Game Over", (255, 255, 255))
+    title_rect = title_text.get_rect(center=(screen.get_width() // 2, screen.get_height() // 4))
+    screen.blit(title_text, title_rect)
+
+    score_text = text_cache.render(font, f"Score: {score}", (255, 255, 255))
+    screen.blit(score_text, score_text.get_rect(center=(screen.get_width() // 2, screen.get_height() // 4 + 50)))
+
+    prompt_text = text_cache.render(font, "Enter your name:", (255, 255, 255))
+    screen.blit(prompt_text, prompt_text.get_rect(center=(screen.get_width() // 2, screen.get_height() // 2 - 40)))
+
+    name_rect = pygame.Rect(0, 0, 300, 40)
+    name_rect.center = (screen.get_width() // 2, screen.get_height() // 2 + 10)
+    pygame.draw.rect(screen, (100, 100, 100), name_rect)
+    if name:
+        name_text = text_cache.render(font, name, (255, 255, 255))
+        screen.blit(name_text, name_text.get_rect(center=name_rect.center))
+
+    ok_text = text_cache.render(font, "OK", (255, 255, 255))
+    ok_rect = ok_text.get_rect(center=(screen.get_width() // 2, screen.get_height() // 2 + 80))
+    pygame.draw.rect(screen, (100, 100, 100), ok_rect.inflate(20, 10))
+    screen.blit(ok_text, ok_rect)
+
+    return ok_rect
+
+
+def draw_reset_confirmation(screen, font):
+    screen.fill((0, 0, 0))
+    question_text = text_cache.render(font, "Reset all highscores?", (255, 255, 255))
+    screen.blit(question_text, question_text.get_rect(center=(screen.get_width() // 2, screen.get_height() // 3)))
+
+    yes_text = text_cache.render(font, "Yes", (255, 255, 255))
+    yes_rect = yes_text.get_rect(center=(screen.get_width() // 2 - 100, screen.get_height() // 2))
+    pygame.draw.rect(screen, (100, 100, 100), yes_rect.inflate(20, 10))
+    screen.blit(yes_text, yes_rect)
+
+    no_text = text_cache.render(font, "No", (255, 255, 255))
+    no_rect = no_text.get_rect(center=(screen.get_width() // 2 + 100, screen.get_height() // 2))
+    pygame.draw.rect(screen, (100, 100, 100), no_rect.inflate(20, 10))
+    screen.blit(no_text, no_rect)
+
+    return yes_rect, no_rect
+
+
+# The HUD runs every frame, so it reuses one rect for the life markers and re-renders the score only when it
+# changes. The score bypasses text_cache, every new score would otherwise take a slot there.
+_life_rect = pygame.Rect(0, 0, 20, 10)
+_score_label = [None, None, None]  # font, score, rendered surface
+
 def draw_score_and_lives(screen, font, score, lives, screen_width, margin):
-    score_text = font.render(f"Score: {score}", True, (255, 255, 255))
-    screen.blit(score_text, (margin, margin // 2))
+    if _score_label[0] is not font or _score_label[1] != score:
+        _score_label[:] = font, score, font.render(f"Score: {score}", True, (255, 255, 255))
+    screen.blit(_score_label[2], (margin, margin // 2))
 
     life_display_size = 20
     for i in range(lives):
-        life_rect = pygame.Rect(screen_width - margin - (i + 1) * (life_display_size + 5), margin, life_display_size, life_display_size // 2)
-        pygame.draw.rect(screen, (0, 0, 255), life_rect)
+        _life_rect.update(screen_width - margin - (i + 1) * (life_display_size + 5), margin, life_display_size, life_display_size // 2)
+        pygame.draw.rect(screen, (0, 0, 255), _life_rect)
+
+
+def draw_session(screen, font, session):
+    """Draw the playing field of a GameSession from scratch.
+
+    The game draws through renderer.SessionRenderer, this full redraw is only kept as bench.py's baseline.
+    """
+    from components import tile_types  # Imported here so the menus don't pull in the NumPy-backed game modules
+    screen.fill((0, 0, 0))
+    session.paddle.draw(screen)
+    session.balls.draw(screen)
+    session.projectiles.draw(screen)
+    for tile, tile_type in session.tiles: ### handle false paddle deletion, draw game space border
+        pygame.draw.rect(screen, tile_types[tile_type]["color"], tile)
+    draw_score_and_lives(screen, font, session.score, session.lives, session.width, session.margin)
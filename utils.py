@@ -1,30 +1,246 @@
 import json
 import os
+import queue
+import random
+import tempfile
+import threading
+import time
 
-HIGHSCORE_FILE = "highscores.json"
+from highscore_store import open_store
+
+HIGHSCORE_FILE = os.environ.get("HIGHSCORE_FILE", "highscores.json")  # A .db/.sqlite path selects the SQLite store
+LEADERBOARD_URL = os.environ.get("LEADERBOARD_URL")  # Central leaderboard.py service, none by default
+LEADERBOARD_OUTBOX = os.environ.get("LEADERBOARD_OUTBOX", "leaderboard_outbox.jsonl")
+CABINET_ID = os.environ.get("CABINET_ID")  # Name the scores of this cabinet are uploaded under, the host name if unset
+
+_store = None
+
+def get_highscore_store():
+    """Highscore backend for HIGHSCORE_FILE, opened on first use."""
+    global _store
+    if _store is None:
+        _store = open_store(HIGHSCORE_FILE)
+    return _store
 
 def load_highscores():
-    """Load highscores from a JSON file."""
-    if os.path.exists(HIGHSCORE_FILE):
-        with open(HIGHSCORE_FILE, "r") as file:
-            highscores = json.load(file)
-    else:
-        highscores = []
-    highscores.sort(key=lambda x: x["score"], reverse=True)
-    return highscores
+    """Load all highscores, highest first."""
+    return get_highscore_store().all()
+
+def top_highscores(k=10):
+    """The k best highscores, served from memory."""
+    return get_highscore_store().top(k)
 
 def save_highscore(name, score):
     """Save a new highscore entry."""
-    highscores = load_highscores()
-    highscores.append({"name": name, "score": score})
-    highscores.sort(key=lambda x: x["score"], reverse=True)
-    with open(HIGHSCORE_FILE, "w") as file:
-        json.dump(highscores, file)
+    get_highscore_store().add(name, score)
 
 def reset_highscores():
-    """Clear highscores after confirmation."""
-    confirmation = input("Are you sure you want to reset highscores? (y/n): ")
-    if confirmation.lower() == 'y':
-        with open(HIGHSCORE_FILE, "w") as file:
-            json.dump([], file)
-        print("Highscores reset successfully.")
+    """Clear highscores. The confirmation is asked for on screen."""
+    get_highscore_store().reset()
+
+class HighscoreWorker:
+    """Runs highscore saving and loading on a background thread so the game loop never waits on disk I/O.
+
+    After every job the worker reloads the top highscores; the game loop picks them up with poll(). With a
+    LeaderboardClient, saved scores are also queued for upload to the central leaderboard.
+    """
+    def __init__(self, k=10, leaderboard=None):
+        self.k = k
+        self.leaderboard = leaderboard
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="highscores", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            function, args = job
+            try:
+                function(*args)
+                self.results.put(top_highscores(self.k))
+            except Exception as error:  # A corrupt file or a locked database must not stop later saves
+                print(f"Highscore update failed: {type(error).__name__}: {error}")
+
+    def refresh(self):
+        self.jobs.put((lambda: None, ()))
+
+    def _save(self, name, score):
+        save_highscore(name, score)
+        if self.leaderboard is not None:
+            self.leaderboard.submit(name, score)
+
+    def save(self, name, score):
+        self.jobs.put((self._save, (name, score)))
+
+    def reset(self):
+        self.jobs.put((reset_highscores, ()))
+
+    def poll(self):
+        """Latest highscore list loaded since the last call, or None."""
+        highscores = None
+        while True:
+            try:
+                highscores = self.results.get_nowait()
+            except queue.Empty:
+                return highscores
+
+    def close(self):
+        """Finish pending jobs and stop the thread."""
+        self.jobs.put(None)
+        self.thread.join()
+
+
+class LeaderboardClient:
+    """Uploads scores to a leaderboard.py service and keeps a cached copy of its global top k.
+
+    submit() appends the score to a durable outbox file (JSON lines) and returns; scores stay there until
+    the service has acknowledged them, so nothing is lost when the network or the cabinet goes down. A
+    background thread uploads the outbox in batches over one keep-alive connection, backing off
+    exponentially with jitter while the service is unreachable, and re-fetches the top k after uploads
+    and every refresh_interval seconds. The game loop only ever reads the cache, with poll().
+    """
+    def __init__(self, url, outbox=LEADERBOARD_OUTBOX, k=10, cabinet=CABINET_ID, batch_size=50, timeout=5,
+                 refresh_interval=30, min_backoff=1, max_backoff=60):
+        from urllib.parse import urlsplit  # Network modules are only loaded on cabinets with a leaderboard
+        import http.client
+        import socket
+        import uuid
+        self._http, self._uuid = http.client, uuid
+        url = urlsplit(url)
+        self.scheme, self.host, self.port = url.scheme, url.hostname, url.port
+        self.prefix = url.path.rstrip("/")
+        self.outbox = outbox
+        self.k = k
+        self.cabinet = cabinet or socket.gethostname()
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.refresh_interval = refresh_interval
+        self.min_backoff, self.max_backoff = min_backoff, max_backoff
+        self.top = None  # Last global top k fetched, None until the first fetch succeeds
+        self.failures = 0  # Consecutive failed requests, drives the backoff
+        self._lock = threading.Lock()  # Guards the outbox file and _pending
+        self._pending = self._read_outbox()  # Scores not acknowledged yet, oldest first
+        self._fresh = None  # Top list fetched since the last poll()
+        self._connection = None
+        self._wake = threading.Event()
+        self._stopping = False
+        self.thread = threading.Thread(target=self._run, name="leaderboard", daemon=True)
+        self.thread.start()
+
+    def _read_outbox(self):
+        if not os.path.exists(self.outbox):
+            return []
+        pending = []
+        with open(self.outbox, "r") as file:
+            for line in file:
+                try:
+                    pending.append(json.loads(line))
+                except ValueError:
+                    pass  # A line cut short by a crash mid-write
+        return pending
+
+    def _write_outbox(self):
+        directory = os.path.dirname(os.path.abspath(self.outbox))
+        with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False) as file:
+            file.writelines(json.dumps(entry) + "\n" for entry in self._pending)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(file.name, self.outbox)
+
+    def submit(self, name, score):
+        """Queue a score for upload. Writes to disk, call it off the frame loop (HighscoreWorker does)."""
+        entry = {"id": self._uuid.uuid4().hex, "name": name, "score": score, "cabinet": self.cabinet}
+        with self._lock:
+            with open(self.outbox, "a") as file:
+                file.write(json.dumps(entry) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+            self._pending.append(entry)
+        self._wake.set()
+
+    @property
+    def pending(self):
+        """Number of scores waiting for upload."""
+        return len(self._pending)
+
+    def poll(self):
+        """Global top k fetched since the last call, or None. Never waits on the network."""
+        fresh, self._fresh = self._fresh, None
+        return fresh
+
+    def _send(self, method, path, body):
+        if self._connection is None:
+            connection_type = self._http.HTTPSConnection if self.scheme == "https" else self._http.HTTPConnection
+            self._connection = connection_type(self.host, self.port, timeout=self.timeout)
+        try:
+            self._connection.request(method, self.prefix + path, body, {"Content-Type": "application/json"})
+            response = self._connection.getresponse()
+            return response.status, json.loads(response.read() or b"null")
+        except (OSError, self._http.HTTPException, ValueError):
+            self._connection.close()
+            self._connection = None
+            raise
+
+    def _request(self, method, path, body=None):
+        """(status, decoded JSON) of a request over the kept-alive connection."""
+        try:
+            return self._send(method, path, body)
+        except (OSError, self._http.HTTPException):
+            # The server may have closed the idle connection, which only shows on its next use
+            return self._send(method, path, body)
+
+    def _upload(self):
+        """Send the oldest batch of the outbox and drop it from there once the service has answered."""
+        with self._lock:
+            batch = self._pending[:self.batch_size]
+        status, _ = self._request("POST", "/scores", json.dumps({"scores": batch}))
+        if status >= 500:
+            raise OSError(f"leaderboard returned {status}")
+        if status != 200:  # Sending it again would fail the same way
+            print(f"Leaderboard rejected {len(batch)} scores ({status}), dropping them")
+        sent = {entry["id"] for entry in batch}
+        with self._lock:
+            self._pending = [entry for entry in self._pending if entry["id"] not in sent]
+            self._write_outbox()
+
+    def _refresh(self):
+        status, payload = self._request("GET", f"/top?k={self.k}")
+        if status != 200:
+            raise OSError(f"leaderboard returned {status}")
+        self.top = self._fresh = payload["scores"]
+
+    def _run(self):
+        refresh_at = 0.0  # time.monotonic() of the next top k fetch
+        while not self._stopping:
+            try:
+                uploaded = False
+                while self._pending and not self._stopping:
+                    self._upload()
+                    uploaded = True
+                if uploaded or time.monotonic() >= refresh_at:
+                    self._refresh()
+                    refresh_at = time.monotonic() + self.refresh_interval
+                self.failures = 0
+                delay = refresh_at - time.monotonic()
+            except (OSError, self._http.HTTPException, ValueError, KeyError, TypeError) as error:
+                self.failures += 1
+                delay = min(self.min_backoff * 2 ** (self.failures - 1), self.max_backoff) * random.uniform(0.5, 1)
+                if self.failures == 1:
+                    print(f"Leaderboard unreachable, retrying: {error}")
+            # New scores end the wait early, except during a backoff
+            deadline = time.monotonic() + delay
+            while self._wake.wait(max(deadline - time.monotonic(), 0)):
+                self._wake.clear()
+                if self._stopping or not self.failures:
+                    break
+        if self._connection is not None:
+            self._connection.close()
+
+    def close(self):
+        """Stop the upload thread. Scores still in the outbox are sent by the next session."""
+        self._stopping = True
+        self._wake.set()
+        self.thread.join(self.timeout)
@@ -0,0 +1,151 @@
+"""Batched, gym-style access to the game for bots and parameter tuning.
+
+    env = VecGameEnv(64, seed=0, ball_speed=7, tile_probabilities={1: 0.2})
+    observations = env.reset()
+    observations, rewards, dones, infos = env.step(actions)  # actions: paddle x in [0, 1], one per game
+
+ShardedVecEnv has the same interface and spreads the games over a pool of worker processes.
+"""
+import multiprocessing
+
+import numpy as np
+
+from components import TileSampler, tile_types, EMPTY
+from engine import GameSession, Inputs
+
+def tile_sampler(probabilities):
+    """TileSampler with some of tile_types' probabilities replaced, e.g. {1: 0.2} for more explosives."""
+    return TileSampler({tile_type: dict(properties, probability=probabilities.get(tile_type, properties["probability"]))
+                        for tile_type, properties in tile_types.items()})
+
+class VecGameEnv:
+    """N independent GameSessions stepped together, with observations and rewards as NumPy arrays.
+
+    An observation row holds the paddle x, the first ball's position and velocity, the ball count, lives
+    and level, followed by one 0/1 occupancy flag per tile cell. Positions are scaled to [0, 1] of the
+    screen, velocities to the base ball speed. The reward is the score gained during the step. Finished
+    games are reset right away, their final info is reported in infos. reset() and step() return arrays
+    the caller owns.
+    """
+    def __init__(self, num_envs, seed=0, frame_skip=1, ball_speed=5, tile_probabilities=None, **session_options):
+        self.num_envs = num_envs
+        self.frame_skip = frame_skip
+        self.ball_speed = ball_speed
+        sampler = tile_sampler(tile_probabilities) if tile_probabilities else TileSampler()
+        self.sessions = [GameSession(seed=seed + i, prefetch_levels=False, ball_speed=ball_speed, tile_sampler=sampler,
+                                     **session_options)
+                         for i in range(num_envs)]
+        first = self.sessions[0]
+        self.width, self.height = first.width, first.height
+        first.start(seed)
+        self.board_shape = first.tiles.types.shape
+        self.observation_size = 7 + first.tiles.types.size
+        self.observations = np.zeros((num_envs, self.observation_size), dtype=np.float32)
+        self.rewards = np.zeros(num_envs, dtype=np.float32)
+        self.dones = np.zeros(num_envs, dtype=bool)
+        self._seeds = seed + num_envs  # Next seed for a game started after one finished
+
+    def _observe(self, i):
+        session, row = self.sessions[i], self.observations[i]
+        balls = session.balls
+        row[0] = session.paddle.rect.centerx / self.width
+        if balls.count:
+            row[1:5] = (balls.x[0] / self.width, balls.y[0] / self.height,
+                        balls.vx[0] / self.ball_speed, balls.vy[0] / self.ball_speed)
+        else:
+            row[1:5] = 0
+        row[5:7] = balls.count, session.lives
+        row[7:] = (session.tiles.types != EMPTY).ravel()
+
+    def reset(self):
+        for i, session in enumerate(self.sessions):
+            session.start(session.seed)
+            self._observe(i)
+        return self.observations.copy()
+
+    def step(self, actions, clicks=None):
+        """Move each game's paddle to actions[i] * screen width for frame_skip ticks.
+
+        Balls held by the paddle are released automatically unless clicks (one bool per game) is given.
+        """
+        actions = np.asarray(actions, dtype=np.float64)
+        infos = [None] * self.num_envs
+        for i, session in enumerate(self.sessions):
+            score = session.score
+            clicked = True if clicks is None else bool(clicks[i])
+            inputs = Inputs(int(actions[i] * self.width), clicked)
+            for _ in range(self.frame_skip):
+                session.step(inputs)
+                if session.game_over:
+                    break
+            self.rewards[i] = session.score - score
+            self.dones[i] = session.game_over
+            if session.game_over:
+                infos[i] = {"score": session.score, "level": session.level, "ticks": session.ticks}
+                session.start(self._seeds)
+                self._seeds += 1
+            self._observe(i)
+        # Copies, so arrays the caller keeps across steps (e.g. in a replay buffer) aren't overwritten
+        return self.observations.copy(), self.rewards.copy(), self.dones.copy(), infos
+
+    def close(self):
+        for session in self.sessions:
+            session.close()
+
+
+def _worker(connection, num_envs, seed, options):
+    env = VecGameEnv(num_envs, seed=seed, **options)
+    try:
+        while True:
+            command, data = connection.recv()
+            if command == "step":
+                connection.send(env.step(*data))
+            elif command == "reset":
+                connection.send(env.reset())
+            else:
+                break
+    finally:
+        env.close()
+        connection.close()
+
+
+class ShardedVecEnv:
+    """VecGameEnv split into shards that run in parallel worker processes."""
+    def __init__(self, num_envs, num_workers=None, seed=0, **options):
+        num_workers = min(num_workers or multiprocessing.cpu_count(), num_envs)
+        sizes = [num_envs // num_workers + (i < num_envs % num_workers) for i in range(num_workers)]
+        self.bounds = np.cumsum([0] + sizes)
+        self.num_envs = num_envs
+        self.connections = []
+        self.processes = []
+        for i, size in enumerate(sizes):
+            parent, child = multiprocessing.Pipe()
+            # Seeds are spread far apart so games started after resets don't repeat across shards
+            process = multiprocessing.Process(target=_worker, args=(child, size, seed + i * 1_000_000, options), daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def reset(self):
+        for connection in self.connections:
+            connection.send(("reset", None))
+        return np.concatenate([connection.recv() for connection in self.connections])
+
+    def step(self, actions, clicks=None):
+        for i, connection in enumerate(self.connections):
+            shard = slice(self.bounds[i], self.bounds[i + 1])
+            connection.send(("step", (actions[shard], None if clicks is None else clicks[shard])))
+        results = [connection.recv() for connection in self.connections]
+        observations = np.concatenate([result[0] for result in results])
+        rewards = np.concatenate([result[1] for result in results])
+        dones = np.concatenate([result[2] for result in results])
+        infos = [info for result in results for info in result[3]]
+        return observations, rewards, dones, infos
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(("close", None))
+            connection.close()
+        for process in self.processes:
+            process.join()